@@ -3,9 +3,12 @@
 from aiodb.cursor import Cursor, Raw
 from aiodb.model.model import Model, quote
 from aiodb.model.model import get_tablename, get_updated, as_dict
+from aiodb.model.model import insert_many, update_many, delete_many
 from aiodb.model.model import RequiredAttributeError, ReservedAttributeError
 from aiodb.model.model import NoneValueError, MultiplePrimaryKeysError
 from aiodb.model.field import Field
+from aiodb.model.session import Session
 from aiodb.model.types import String, Integer, Boolean, Date, Datetime, Binary
 from aiodb.model.types import Char, Enum
 from aiodb.pool import Pool
+from aiodb.router import Router
@@ -1,4 +1,5 @@
 """generic cursor"""
+from aiodb.util import LRUCache
 
 
 class Raw:  # pylint: disable=too-few-public-methods
@@ -11,12 +12,47 @@ class Raw:  # pylint: disable=too-few-public-methods
         return f"Raw('{self.data}')"
 
 
+class Row:
+    """represent a row of a resultset
+
+       The row tuple from the database is kept as is; columns are found by
+       name using an index shared by all of the rows in a resultset.
+    """
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index, values):
+        self._index = index  # {column name: position in values}
+        self._values = values
+
+    def __getattr__(self, name):
+        if name in Row.__slots__:  # not yet assigned
+            raise AttributeError(name)
+        try:
+            return self._values[self._index[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self._values[self._index[name]]
+
+    def __repr__(self):
+        return str({name: self._values[pos]
+                    for name, pos in self._index.items()})
+
+
+def row_index(columns):
+    """return {column name: position} for Row"""
+    return {name: pos for pos, name in enumerate(columns)}
+
+
 class Cursor:  # pylint: disable=too-many-instance-attributes
     """abstract cursor class"""
 
     def __init__(self,  # pylint: disable=too-many-arguments
                  execute, ping, close, serialize, last_id, last_message,
-                 quote='`', transactions=True):
+                 quote='`', transactions=True, execute_prepared=None,
+                 prepare=None, deallocate=None, prepared=False,
+                 statement_cache_size=100, stream=None):
         """Database cursor
 
            Abstract interface to a database. A cursor represents one
@@ -64,7 +100,58 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
                 quote - quote character surrounding table/field names
 
                 transactions - if False, disable transactions
+
+                execute_prepared - optional callable that executes a query
+                                   with separate parameters
+
+                    Definition:
+                        async def execute_prepared(statement, params, **kwargs)
+
+                    Arguments:
+                        statement - statement handle returned by prepare,
+                                    or, if prepare is not specified, the
+                                    query string (with %s placeholders)
+                        params    - tuple of unescaped parameter values
+                        kwargs    - database specific
+
+                    Result:
+                        Same as execute
+
+                prepare - optional callable that prepares a statement on the
+                          server
+
+                    async def prepare(query)
+                    Return:
+                        statement handle
+
+                deallocate - optional callable that releases a statement
+                             handle discarded from the statement cache
+
+                    async def deallocate(statement)
+
+                prepared - if True, use execute_prepared instead of execute
+
+                statement_cache_size - number of prepared statement handles
+                                       kept for this connection
+
+                stream - optional callable that executes a query and returns
+                         the result incrementally (for instance, using a
+                         server-side cursor or fetchmany)
+
+                    Definition:
+                        def stream(query, batch_size, **kwargs)
+
+                    Arguments:
+                        query      - escaped sql command string
+                        batch_size - preferred number of rows per batch
+                        kwargs     - database specific
+
+                    Result:
+                        async iterator of (columns, rows) tuples, where rows
+                        is a list of at most batch_size row tuples
         """
+        if prepared and execute_prepared is None:
+            raise ValueError("prepared requires execute_prepared")
         self._execute = execute
         self.ping = ping
         self.close = close
@@ -79,6 +166,13 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
         self._has_transactions = transactions
         self._transaction_depth = 0
 
+        self._execute_prepared = execute_prepared
+        self._prepare = prepare
+        self._deallocate = deallocate
+        self.prepared = prepared
+        self.statements = LRUCache(statement_cache_size)
+        self._stream = stream
+
     @classmethod
     def bind(cls, connection, transactions=True, **kwargs):
         """bind connection to cursor by attribute name
@@ -91,11 +185,23 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
                               last_id
                               last_message
                               quote
-                          by name
+                          by name, and optionally:
+                              execute_prepared
+                              prepare
+                              deallocate
+                              stream
            transactions - if False, disable transactions
            kwargs       - any kwarg whose key matches a Cursor parameter will
                           be used in place of the connection attribute
         """
+        optional = {
+            name: kwargs.get(name, getattr(connection, name, None))
+            for name in (
+                "execute_prepared", "prepare", "deallocate", "stream")
+        }
+        for name in ("prepared", "statement_cache_size"):
+            if name in kwargs:
+                optional[name] = kwargs[name]
         args = [
             kwargs.get("execute", connection.execute),
             kwargs.get("ping", connection.ping),
@@ -106,7 +212,7 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
             kwargs.get("quote", connection.quote),
             transactions,
         ]
-        return cls(*args)
+        return cls(*args, **optional)
 
     async def _transaction(self, command):
         if self._has_transactions:
@@ -160,10 +266,27 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
 
           Result:
               Same as result of execute function specified in __init__.
+
+          Notes:
+              1. If the cursor is "prepared", args are not escaped or
+                 substituted; instead, the query and args are passed
+                 separately to execute_prepared, and query_after is the
+                 query string as sent. Raw args are still substituted
+                 directly into the query string.
         """
         self.query = query
         self.query_after = None
 
+        if self.prepared:
+            return await self._execute_with_params(query, args, **kwargs)
+
+        query = self._substitute(query, args)
+        self.query_after = query
+        return await self._execute(query, **kwargs)
+
+    def _substitute(self, query, args):
+        """return query with escaped args substituted"""
+
         def _serialize(item):
             if isinstance(item, Raw):
                 return item.data
@@ -175,9 +298,67 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
             else:
                 args = _serialize(args)
             query = query % args
+        return query
+
+    async def execute_stream(self, query, args=None, batch_size=1000,
+                             **kwargs):
+        """Execute an arbitrary SQL command, returning rows in batches
 
+           The query is handled as in execute (args are always substituted
+           into the query). If the stream function was specified in
+           __init__, rows are read from the database incrementally;
+           otherwise, the entire result is read by execute and returned
+           in batches.
+
+           Parameters:
+               query      - query string (with %s substitutions)
+               args       - substitution parameters
+               batch_size - preferred number of rows per batch
+               kwargs     - database specific
+
+           Result:
+               async iterator of (columns, rows) tuples
+        """
+        if self._stream is None:
+            columns, rows = await self.execute(query, args, **kwargs)
+            for start in range(0, len(rows), batch_size):
+                yield columns, rows[start:start + batch_size]
+            return
+
+        self.query = query
+        self.query_after = None
+        query = self._substitute(query, args)
         self.query_after = query
-        return await self._execute(query, **kwargs)
+        async for columns, rows in self._stream(query, batch_size, **kwargs):
+            yield columns, rows
+
+    async def _execute_with_params(self, query, args, **kwargs):
+        """execute query with separate parameters"""
+        if args is None:
+            params = ()
+        elif isinstance(args, (list, tuple)):
+            params = tuple(args)
+        else:
+            params = (args,)
+
+        if any(isinstance(param, Raw) for param in params):
+            query = query % tuple(
+                param.data if isinstance(param, Raw) else '%s'
+                for param in params)
+            params = tuple(
+                param for param in params if not isinstance(param, Raw))
+
+        self.query_after = query
+        statement = query
+        if self._prepare is not None:
+            statement = self.statements.get(query)
+            if statement is None:
+                statement = await self._prepare(query)
+                discarded = self.statements.put(query, statement)
+                if discarded is not None and self._deallocate is not None:
+                    await self._deallocate(discarded)
+
+        return await self._execute_prepared(statement, params, **kwargs)
 
     async def select(self, query, args=None, one=False):
         """Run an arbitrary select statement
@@ -198,20 +379,32 @@ class Cursor:  # pylint: disable=too-many-instance-attributes
         """
         columns, rows = await self.execute(query, args=args)
 
-        class Row:
-            """represent a row of a resultset"""
+        if rows:
+            index = row_index(columns)
+            if one:
+                return Row(index, rows[0])
+            return [Row(index, row) for row in rows]
 
-            def __init__(self, **kwargs):
-                self.__dict__.update(kwargs)
+    async def iterate(self, query, args=None, batch_size=1000):
+        """Run an arbitrary select statement, yielding one row at a time
 
-            def __getitem__(self, name):
-                return self.__dict__[name]
+            Rows are the same row-objects returned by select. Unless the
+            entire result is read at once (see execute_stream), no more than
+            batch_size rows are held in memory.
 
-            def __repr__(self):
-                return str(self.__dict__)
+            Parameters:
+                query      - query string (with %s substitutions)
+                args       - substitution parameters
+                             (None, scalar or tuple)
+                batch_size - preferred number of rows read at a time
 
-        if rows:
-            result = [Row(**(dict(zip(columns, row)))) for row in rows]
-            if one and result:
-                return result[0]
-            return result
+            Result:
+                async iterator of row-objects
+        """
+        index = None
+        async for columns, rows in self.execute_stream(
+                query, args, batch_size):
+            if index is None:
+                index = row_index(columns)
+            for row in rows:
+                yield Row(index, row)
@@ -1,11 +1,24 @@
 """database field"""
+from aiodb.cursor import Raw
 from aiodb.model.types import String
 from aiodb.util import import_by_path
 
 
+class NoneValueError(ValueError):
+    """custom exception"""
+
+
 class Field():  # pylint: disable=too-few-public-methods
     # pylint: disable=too-many-instance-attributes
-    """model database field"""
+    """model database field
+
+       A Field is a data descriptor on the Model class. Instance values are
+       kept in the Model's instance state ("_s.values") at the Field's index,
+       which is assigned by the Model's metaclass. The first time a value is
+       set after init or save, the previous value is recorded in
+       "_s.original" so that changes can be found without comparing every
+       field.
+    """
     def __init__(self,  # pylint: disable=too-many-arguments
                  type=String,  # pylint: disable=redefined-builtin
                  default=None, column=None,
@@ -13,9 +26,11 @@ class Field():  # pylint: disable=too-few-public-methods
                  expression=None, is_readonly=False, is_database=True):
         self.type = type
         self.parse = type.parse
+        self.native = getattr(type, 'native', ())
         self.default = default
         self.column = column
         self.name = None
+        self.index = None
         self.is_readonly = is_readonly or expression is not None
         self.is_nullable = is_nullable or is_primary or self.is_readonly
         self.is_primary = is_primary
@@ -24,6 +39,26 @@ class Field():  # pylint: disable=too-few-public-methods
         self.expression = expression
         self.is_database = is_database
 
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance._s.values[self.index]
+
+    def __set__(self, instance, value):
+        if value is None:
+            if not self.is_nullable:
+                raise NoneValueError(self.name)
+        elif not isinstance(value, Raw):
+            value = self.parse(value)
+        state = instance._s
+        index = self.index
+        original = state.original
+        if original is None:
+            state.original = {index: state.values[index]}
+        elif index not in original:
+            original[index] = state.values[index]
+        state.values[index] = value
+
     @property
     def foreign(self):
         """return foreign reference as a class
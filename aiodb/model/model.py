@@ -1,9 +1,12 @@
 """Object Relational Model"""
 # pylint: disable=protected-access
-from aiodb.cursor import Raw
+import copy
+
 from aiodb.model.field import Field
+from aiodb.model.field import (  # noqa: F401 pylint: disable=unused-import
+    NoneValueError)
 from aiodb.model.query import Query
-from aiodb.util import snake_to_camel
+from aiodb.util import LRUCache, snake_to_camel
 
 
 __reserved__ = ("load", "save", "delete", "query")
@@ -17,10 +20,6 @@ class ReservedAttributeError(AttributeError):
     """custom exception"""
 
 
-class NoneValueError(ValueError):
-    """custom exception"""
-
-
 class MultiplePrimaryKeysError(AttributeError):
     """custom exception"""
 
@@ -40,7 +39,7 @@ def get_updated(model):
 
        {"name" : (old_value, new_value), ...}
     """
-    return model._s.updated
+    return model._s.updated or {}
 
 
 def as_dict(model):
@@ -57,19 +56,115 @@ class _ModelState:  # pylint: disable=too-few-public-methods
     def __init__(self, table_name=None):
         self.table_name = table_name
         self.fields = None
+        self.by_name = None  # {name: Field}
         self.db_read = None
+        self.db_unread = None
         self.db_insert = None
         self.db_update = None
+        self.updatable = None
         self.primary = None
         self.foreign = None
+        self.targets = None  # {Model class: [foreign Field, ...]} (lazy)
+        self.statements = LRUCache(100)  # compiled statements (see below)
+        self.load_query = None
 
     def field(self, name):
         """return a field by name"""
         try:
-            return [field for field in self.fields if field.name == name][0]
-        except IndexError as exc:
+            return self.by_name[name]
+        except KeyError as exc:
             raise AttributeError(name) from exc
 
+    def references(self, target):
+        """return list of foreign key fields which reference target
+
+           the index is built on first use, since Field.foreign resolves
+           import paths lazily
+        """
+        if self.targets is None:
+            targets = {}
+            for fld in self.foreign:
+                targets.setdefault(fld.foreign, []).append(fld)
+            self.targets = targets
+        return self.targets.get(target, [])
+
+    def insert_statement(self, fields, quote_char, rows=1):
+        """return INSERT statement for fields with one or more rows"""
+        key = ('INSERT', quote_char, tuple(fields), rows)
+        stmt = self.statements.get(key)
+        if stmt is None:
+            values = '( ' + ','.join('%s' for n in range(len(fields))) + ' )'
+            stmt = ' '.join((
+                'INSERT INTO',
+                quote(self.table_name),
+                '(',
+                ','.join(quote(f.column) for f in fields),
+                ') VALUES',
+                ','.join(values for n in range(rows)),
+            )).format(Q=quote_char)
+            self.statements.put(key, stmt)
+        return stmt
+
+    def update_statement(self, fields, quote_char):
+        """return UPDATE by primary key statement for fields"""
+        key = ('UPDATE', quote_char, tuple(fields))
+        stmt = self.statements.get(key)
+        if stmt is None:
+            stmt = ' '.join((
+                'UPDATE ',
+                quote(self.table_name),
+                'SET',
+                ','.join([f'{quote(fld.column)}=%s' for fld in fields]),
+                'WHERE ',
+                f'{quote(self.primary.name)}=%s'
+            )).format(Q=quote_char)
+            self.statements.put(key, stmt)
+        return stmt
+
+    def update_many_statement(self, fields, quote_char, rows):
+        """return UPDATE statement for fields of "rows" primary keys
+
+           each field is SET with a CASE on the primary key; the arguments
+           are (key, value) pairs for each field, followed by the keys
+        """
+        key = ('UPDATE', quote_char, tuple(fields), rows)
+        stmt = self.statements.get(key)
+        if stmt is None:
+            primary = quote(self.primary.name)
+            cases = ' '.join('WHEN %s THEN %s' for n in range(rows))
+            stmt = ' '.join((
+                'UPDATE ',
+                quote(self.table_name),
+                'SET',
+                ','.join([
+                    f'{quote(fld.column)}=CASE {primary} {cases} END'
+                    for fld in fields]),
+                'WHERE ',
+                f'{primary} IN (' + ','.join('%s' for n in range(rows)) + ')'
+            )).format(Q=quote_char)
+            self.statements.put(key, stmt)
+        return stmt
+
+    def delete_statement(self, quote_char, rows=None):
+        """return DELETE by primary key statement
+
+           if rows is specified, return a statement that deletes "rows"
+           primary keys using IN
+        """
+        key = ('DELETE', quote_char, rows)
+        stmt = self.statements.get(key)
+        if stmt is None:
+            if rows is None:
+                where = f"{quote(self.primary.name)}=%s"
+            else:
+                where = f"{quote(self.primary.name)} IN (" + \
+                    ','.join('%s' for n in range(rows)) + ")"
+            stmt = (
+                f"DELETE FROM {quote(self.table_name)} WHERE {where}"
+            ).format(Q=quote_char)
+            self.statements.put(key, stmt)
+        return stmt
+
 
 class _Model(type):
     """metaclass for base orm
@@ -93,28 +188,40 @@ class _Model(type):
         state = attrs["_m"] = _ModelState(table_name=table_name)
 
         # --- grab fields from supers and class
-        fields = []
+        fields = {}
 
-        def update_fields(data):
+        def update_fields(data, inherited=False):
             for key, value in data.items():
                 if isinstance(value, Field):
                     if key in __reserved__:
                         raise ReservedAttributeError(key)
+                    if inherited and key in attrs:
+                        continue  # overridden in class
+                    if value.index is not None:
+                        # inherited or shared with another class; each
+                        # class has its own copy (see Field.index)
+                        value = attrs[key] = copy.copy(value)
                     if value.column is None:
                         value.column = key
                     value.name = key
-                    fields.append(value)
+                    fields[key] = value
 
         for sup in supers[::-1]:
-            update_fields(sup.__dict__)
+            update_fields(sup.__dict__, inherited=True)
         update_fields(attrs)
 
         # --- add fields to state
+        fields = list(fields.values())
+        for index, fld in enumerate(fields):
+            fld.index = index
         state.fields = fields
+        state.by_name = {fld.name: fld for fld in fields}
         state.db_read = [fld for fld in fields if fld.is_database]
+        state.db_unread = [fld for fld in fields if not fld.is_database]
         state.db_insert = [fld for fld in state.db_read if not fld.is_readonly]
         state.db_update = [
             fld for fld in state.db_insert if not fld.is_primary]
+        state.updatable = frozenset(fld.index for fld in state.db_update)
 
         primary = [fld for fld in fields if fld.is_primary]
         if len(primary) > 1:
@@ -124,6 +231,9 @@ class _Model(type):
 
         state.foreign = [fld for fld in state.db_read if fld.is_foreign]
 
+        # --- field values are kept in "_s"; don't add a __dict__ per class
+        attrs.setdefault("__slots__", ())
+
         return super().__new__(cls, name, supers, attrs)
 
     @property
@@ -133,13 +243,18 @@ class _Model(type):
 
 
 class _State:  # pylint: disable=too-few-public-methods
-    """instance state"""
+    """instance state
+
+       field values are stored by position (Field.index); the other
+       attributes are allocated when first needed
+    """
+    __slots__ = ("values", "original", "updated", "tables")
 
-    def __init__(self):
-        self.values = {}  # instance value store
-        self.original = {}  # cache of field values from init or save
-        self.updated = {}  # list of changes processed at most recent save
-        self.tables = {}  # dict of joined models from query
+    def __init__(self, values):
+        self.values = values  # instance value store
+        self.original = None  # {index: value} of fields set since init/save
+        self.updated = None  # dict of changes processed at most recent save
+        self.tables = None  # dict of joined models from query
 
 
 class Model(metaclass=_Model):
@@ -160,10 +275,15 @@ class Model(metaclass=_Model):
            3. The Model's State is kept in the "_m" attribute and the instance
               state is kept in the "_s" attribute.  The "_m" attribute is
               shared with all instances.
+
+           4. Fields are data descriptors. Assigning a public attribute
+              which is not a Field raises AttributeError; "_*" attributes
+              can be assigned freely.
     """
+    __slots__ = ("_s", "__dict__", "__weakref__")
 
     def __init__(self, **kwargs):
-        self._s = _State()
+        self._s = _State([None] * len(self._m.fields))
 
         for field in self._m.fields:
             if not field.is_nullable and field.default is None:
@@ -176,6 +296,36 @@ class Model(metaclass=_Model):
 
         cache_field_values(self)
 
+    @classmethod
+    def _hydrate(cls, data):
+        """create an instance from a database row
+
+           "data" is a sequence of values for the fields in "_m.db_read". The
+           values are trusted: they are stored directly, and only parsed if
+           the value's type isn't one of the Field type's "native" types.
+
+           A Model with its own __init__ is created by calling the class,
+           so that the custom constructor runs.
+        """
+        if cls.__init__ is not Model.__init__:
+            return cls(**dict(zip(
+                (fld.name for fld in cls._m.db_read), data)))
+
+        self = object.__new__(cls)
+        values = [None] * len(cls._m.fields)
+        state = _State(values)
+        object.__setattr__(self, '_s', state)
+        for field, value in zip(cls._m.db_read, data):
+            if value is not None and type(value) not in field.native:
+                value = field.parse(value)
+            values[field.index] = value
+        for field in cls._m.db_unread:
+            if not field.is_nullable and field.default is None:
+                raise RequiredAttributeError(field.name)
+            setattr(self, field.name, field.default)
+        state.original = None
+        return self
+
     def __repr__(self):
         key = self._m.primary
         if key:
@@ -193,51 +343,30 @@ class Model(metaclass=_Model):
         return result
 
     def __getitem__(self, name):
-        return self._s.tables[name]
+        return (self._s.tables or {})[name]
 
-    def __getattribute__(self, name):
-        if name.startswith("_"):
-            value = object.__getattribute__(self, name)
-        else:
+    def __getattr__(self, name):
+        # only called when normal lookup fails
+        if not name.startswith("_"):
             try:
-                value = object.__getattribute__(self, name)
-            except AttributeError:
-                try:
-                    # dot notation access for joined tables
-                    return self._s.tables[name]
-                except (AttributeError, KeyError):
-                    pass
-                raise
-
-            if isinstance(value, Field):
-                values = self._s.values
-                if name not in values:
-                    raise AttributeError(name)
-                value = values[name]
-
-        return value
+                # dot notation access for joined tables
+                return (self._s.tables or {})[name]
+            except (AttributeError, KeyError):
+                pass
+        raise AttributeError(name)
 
     def __setattr__(self, name, value):
-        if name.startswith('_'):
-            object.__setattr__(self, name, value)
-        else:
-            attr = object.__getattribute__(self, name)
-            if not isinstance(attr, Field):
-                raise AttributeError(name)
-            values = self._s.values
-            if value is None:
-                if not attr.is_nullable:
-                    raise NoneValueError(name)
-                values[name] = value
-            elif isinstance(value, Raw):
-                values[name] = value
-            else:
-                values[name] = attr.parse(value)
+        if name not in self._m.by_name and not name.startswith("_"):
+            raise AttributeError(name)
+        object.__setattr__(self, name, value)
 
     @classmethod
     async def load(cls, cursor, key):
         """Load a database row by primary key"""
-        query = cls.query.where(f'{quote(cls._m.primary.name)}=%s')
+        query = cls._m.load_query
+        if query is None:
+            query = cls._m.load_query = \
+                cls.query.where(f'{quote(cls._m.primary.name)}=%s')
         return await query.execute(cursor, key, one=True)
 
     async def save(self, cursor, force_insert=False):
@@ -267,16 +396,15 @@ class Model(metaclass=_Model):
                   instance.
         """
         key = self._m.primary
-        self._s.updated = {}
+        self._s.updated = None
         cursor.query = None
         cursor.query_after = None
-        stmt = ''
 
         if force_insert:
             if not key:
                 raise Exception("force_insert is not valid without primary key")
             if getattr(self, key.name) is None:
-                raise Exception(
+                raise ValueError(
                     "force_insert is not valid without a primary key value")
             is_insert = True
         elif key is None:
@@ -287,42 +415,18 @@ class Model(metaclass=_Model):
             is_insert = False
 
         if is_insert:
-            fields = self._m.db_insert if force_insert else self._m.db_update
-            fields = [
-                f
-                for f in fields
-                if not (f.is_nullable and getattr(self, f.name) is None)
-            ]
-            field_names = [
-                f.column
-                for f in fields
-            ]
-            stmt = ' '.join((
-                'INSERT INTO',
-                quote(self._m.table_name),
-                '(',
-                ','.join(quote(f) for f in field_names),
-                ') VALUES (',
-                ','.join('%s' for n in range(len(field_names))),
-                ')',
-            ))
+            fields = fields_to_insert(self, force_insert)
+            stmt = self._m.insert_statement(fields, cursor.quote)
             args = [getattr(self, f.name) for f in fields]
         else:
+            stmt = None
             fields = fields_to_update(self)
             if fields:
-                stmt = ' '.join((
-                    'UPDATE ',
-                    quote(self._m.table_name),
-                    'SET',
-                    ','.join([f'{quote(fld.column)}=%s' for fld in fields]),
-                    'WHERE ',
-                    f'{quote(key.name)}=%s'
-                ))
+                stmt = self._m.update_statement(fields, cursor.quote)
                 args = [getattr(self, fld.name) for fld in fields]
                 args.append(getattr(self, key.name))
 
         if fields:
-            stmt = stmt.format(Q=cursor.quote)
             await cursor.execute(stmt, args,
                                  is_insert=is_insert,
                                  pk=key.name if key else None)
@@ -335,7 +439,7 @@ class Model(metaclass=_Model):
 
             self._s.updated = {
                 fld.name: (
-                    None if is_insert else self._s.original.get(fld.name),
+                    None if is_insert else self._s.original.get(fld.index),
                     getattr(self, fld.name))
                 for fld in fields}
             cache_field_values(self)
@@ -344,26 +448,257 @@ class Model(metaclass=_Model):
 
     async def delete(self, cursor):
         """Delete matching row from database by primary key"""
-        stmt = (
-            f"DELETE FROM {quote(self._m.table_name)}"
-            f" WHERE {quote(self._m.primary.name)}=%s"
-        ).format(Q=cursor.quote)
+        stmt = self._m.delete_statement(cursor.quote)
         await cursor.execute(stmt, getattr(self, self._m.primary.name))
 
 
 def cache_field_values(model):
-    """cache model field values in '_s.original'"""
-    model._s.original = {
-        fld.name: getattr(model, fld.name) for
-        fld in model._m.db_update
-    }
+    """make the current field values the originals
+
+       Field.__set__ records a field's original value the first time it is
+       set; this clears those records, so nothing is changed.
+    """
+    model._s.original = None
+
+
+def fields_to_insert(model, force_insert=False):
+    """return list of fields to INSERT
+
+       the primary key is only included if force_insert is True; nullable
+       fields with a None value are skipped
+    """
+    fields = model._m.db_insert if force_insert else model._m.db_update
+    return [
+        f
+        for f in fields
+        if not (f.is_nullable and getattr(model, f.name) is None)
+    ]
 
 
 def fields_to_update(model):
-    """return list of changed fields or None"""
+    """return list of changed fields or None
+
+       only fields which have been set since init or save are compared
+    """
+    original = model._s.original
+    if not original:
+        return None
+    values = model._s.values
+    updatable = model._m.updatable
+    fields = model._m.fields
     fields = [
-        fld
-        for fld in model._m.db_update
-        if getattr(model, fld.name) != model._s.original[fld.name]
+        fields[index]
+        for index in sorted(original)
+        if index in updatable and values[index] != original[index]
     ]
     return None if len(fields) == 0 else fields
+
+
+async def insert_many(cursor, models,  # pylint: disable=too-many-arguments
+                      force_insert=False, max_rows=1000, max_bytes=1000000,
+                      consecutive_keys=False, require_keys=False):
+    # pylint: disable=too-many-locals
+    """INSERT models using multi-row INSERT statements
+
+       models are grouped by class and by the set of fields that
+       Model.save would insert; each group is inserted in batches of at
+       most max_rows rows, and, approximately, max_bytes of values.
+
+       Parameters:
+           cursor           - database cursor
+           models           - iterable of Model instances
+           force_insert     - include primary key values (see Model.save)
+           max_rows         - maximum number of rows per statement
+           max_bytes        - maximum size of values per statement, estimated
+                              from the string length of each value
+                              (None means no limit)
+           consecutive_keys - if True, and the database doesn't return the
+                              inserted keys, assign last_id(), last_id()+1,
+                              ... to the models of each batch (this is how
+                              MySQL assigns auto-increment keys to a
+                              multi-row INSERT); a batch of one row always
+                              gets last_id()
+           require_keys     - if True, insert one row until the database
+                              returns the inserted keys; if it does, insert
+                              the rest in batches, otherwise, insert one row
+                              at a time so that each model gets last_id()
+
+       Returns the list of models.
+
+       Notes:
+           1. If the cursor's execute returns one row per inserted model, the
+              first column of each row is assigned as the model's primary key
+              (for instance, from INSERT ... RETURNING).
+           2. Without force_insert, models must not have a primary key value
+              (Model.save would UPDATE them).
+           3. As with Model.save, the "_s.updated" attribute of each model is
+              set to {field_name: (None, value), ...}.
+    """
+    models = list(models)
+    groups = {}
+    for model in models:
+        key = model._m.primary
+        if force_insert:
+            if not key or getattr(model, key.name) is None:
+                raise ValueError(
+                    "force_insert is not valid without a primary key value")
+        elif key and getattr(model, key.name) is not None:
+            raise ValueError(
+                "a primary key value is not valid without force_insert")
+        fields = tuple(fields_to_insert(model, force_insert))
+        groups.setdefault((type(model), fields), []).append(model)
+
+    limit = max_rows
+    if require_keys and not force_insert and not consecutive_keys:
+        limit = 1  # until the database is known to return keys
+
+    async def insert(cls, fields, batch):
+        nonlocal limit
+        if await _insert_batch(
+                cursor, cls, fields, batch, force_insert, consecutive_keys):
+            limit = max_rows
+
+    for (cls, fields), group in groups.items():
+        batch = []
+        size = 0
+        for model in group:
+            args = [getattr(model, fld.name) for fld in fields]
+            if max_bytes is not None:
+                row_size = sum(len(str(arg)) + 1 for arg in args) + 4
+                if batch and size + row_size > max_bytes:
+                    await insert(cls, fields, batch)
+                    batch, size = [], 0
+                size += row_size
+            batch.append((model, args))
+            if len(batch) >= limit:
+                await insert(cls, fields, batch)
+                batch, size = [], 0
+        if batch:
+            await insert(cls, fields, batch)
+
+    return models
+
+
+async def _insert_batch(  # pylint: disable=too-many-arguments
+        cursor, cls, fields, batch, force_insert, consecutive_keys):
+    """INSERT one batch of (model, args) of the same class and fields
+
+       returns True if the database returned the inserted keys
+    """
+    key = cls._m.primary
+    stmt = cls._m.insert_statement(fields, cursor.quote, len(batch))
+    args = [arg for _, row in batch for arg in row]
+    result = await cursor.execute(stmt, args, is_insert=True,
+                                  pk=key.name if key else None)
+
+    returned = False
+    if key and not force_insert:
+        returned = _assign_keys(cursor, key, batch, result, consecutive_keys)
+
+    for model, _ in batch:
+        model._s.updated = {
+            fld.name: (None, getattr(model, fld.name)) for fld in fields}
+        cache_field_values(model)
+    return returned
+
+
+def _assign_keys(cursor, key, batch, result, consecutive_keys):
+    """assign inserted keys to the models of a batch
+
+       returns True if the keys were returned by the database
+    """
+    rows = result[1] if result else None
+    if rows and len(rows) == len(batch):
+        for (model, _), row in zip(batch, rows):
+            setattr(model, key.name, row[0])
+        return True
+    if consecutive_keys or len(batch) == 1:
+        first = cursor.last_id()
+        for offset, (model, _) in enumerate(batch):
+            setattr(model, key.name, first + offset)
+    return False
+
+
+def _chunks(items, size):
+    """yield successive lists of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def update_many(cursor, models, batch_size=500):
+    """UPDATE changed fields of models using batched statements
+
+       models are grouped by class and by the set of changed fields (see
+       fields_to_update); each group is updated with one statement per
+       batch_size models, which SETs each field with a CASE on the primary
+       key. Models without changes are skipped.
+
+       Returns the list of models.
+
+       Notes:
+           1. Every model must have a primary key value.
+           2. As with Model.save, the "_s.updated" attribute of each model is
+              set to {field_name: (old_value, new_value), ...} for each
+              changed field.
+    """
+    models = list(models)
+    groups = {}
+    for model in models:
+        key = model._m.primary
+        if not key or getattr(model, key.name) is None:
+            raise ValueError("update_many requires a primary key value")
+        model._s.updated = None
+        fields = fields_to_update(model)
+        if fields:
+            groups.setdefault((type(model), tuple(fields)), []).append(model)
+
+    for (cls, fields), group in groups.items():
+        key = cls._m.primary
+        for batch in _chunks(group, batch_size):
+            stmt = cls._m.update_many_statement(
+                fields, cursor.quote, len(batch))
+            keys = [getattr(model, key.name) for model in batch]
+            args = [
+                arg
+                for fld in fields
+                for model, pk in zip(batch, keys)
+                for arg in (pk, getattr(model, fld.name))
+            ]
+            args.extend(keys)
+            await cursor.execute(stmt, args, is_insert=False, pk=key.name)
+
+            for model in batch:
+                model._s.updated = {
+                    fld.name: (
+                        model._s.original.get(fld.index),
+                        getattr(model, fld.name))
+                    for fld in fields}
+                cache_field_values(model)
+
+    return models
+
+
+async def delete_many(cursor, models_or_keys, model=None, batch_size=1000):
+    """DELETE rows by primary key using batched IN statements
+
+       Parameters:
+           cursor         - database cursor
+           models_or_keys - iterable of Model instances and/or primary key
+                            values
+           model          - Model class of any primary key values
+           batch_size     - maximum number of keys per statement
+    """
+    groups = {}
+    for item in models_or_keys:
+        if isinstance(item, Model):
+            cls, key = type(item), getattr(item, item._m.primary.name)
+        elif model is None:
+            raise ValueError("model is required to delete by key")
+        else:
+            cls, key = model, item
+        groups.setdefault(cls, []).append(key)
+
+    for cls, keys in groups.items():
+        for batch in _chunks(keys, batch_size):
+            stmt = cls._m.delete_statement(cursor.quote, len(batch))
+            await cursor.execute(stmt, batch)
@@ -4,8 +4,18 @@ The MIT License (MIT)
 https://github.com/robertchase/aiodb/blob/master/LICENSE.txt
 """
 # pylint: disable=protected-access
+import collections
+import copy
+import functools
 import inspect
-from aiodb.util import import_by_path, snake_to_camel
+from aiodb.util import LRUCache, import_by_path, snake_to_camel
+
+
+# compiled SELECT statements by query shape (see Query._prepare)
+STATEMENTS = LRUCache(1000)
+
+# result row layouts by query tables (see Query._layout)
+LAYOUTS = LRUCache(1000)
 
 
 class Query:
@@ -16,6 +26,8 @@ class Query:
         self._tables = [tab]
         self._where = None
         self._order = None
+        self._seek = None  # (field names, descending)
+        self._after = None  # key values of the last row of previous page
 
     def where(self, where=None):
         """accept where clause"""
@@ -27,6 +39,59 @@ class Query:
         self._order = order
         return self
 
+    def seek(self, keys, after=None, descending=False):
+        """accept keyset (seek) pagination
+
+           Rows are ordered by "keys", and only rows that come after the
+           "after" values are selected. This replaces the need for OFFSET,
+           which makes the database read and discard all of the skipped rows.
+
+            Parameters:
+                keys       - field name or list of field names which
+                             together uniquely order the rows; a name may
+                             be prefixed with a table alias ("alias.name"),
+                             otherwise it is a field of the primary table
+                after      - value or tuple of values of keys from the last
+                             row of the previous page (None for first page)
+                descending - if True, order keys descending
+
+            Notes:
+                1. The keys replace any order clause.
+                2. The after values are added to the end of the execute args.
+        """
+        if isinstance(keys, str):
+            keys = (keys,)
+        if after is not None and not isinstance(after, (list, tuple)):
+            after = (after,)
+        if after is not None and len(after) != len(keys):
+            raise ValueError('after must have one value for each key')
+        self._seek = (tuple(keys), descending)
+        self._after = after
+        return self
+
+    async def pages(self,  # pylint: disable=too-many-arguments
+                    cursor, keys, args=None, size=1000, descending=False):
+        """execute query one page at a time using keyset pagination
+
+           yields lists of at most "size" models, in "keys" order (see seek),
+           until all rows are read; each page costs the same no matter how
+           deep it is
+
+           the pages are read with a copy of the query, so the query's own
+           seek state is unchanged
+        """
+        query = copy.copy(self)
+        after = None
+        while True:
+            query.seek(keys, after, descending)
+            rows = await query.execute(cursor, args, limit=size)
+            if rows:
+                yield rows
+            if len(rows) < size:
+                return
+            after = tuple(
+                query._seek_value(rows[-1], key) for key in query._seek[0])
+
     def join(self, table, table2=None, alias=None, outer=None):
         """Add a table to the query
 
@@ -102,11 +167,25 @@ class Query:
 
     def _prepare(self,  # pylint: disable=too-many-arguments
                  one, limit, offset, for_update, quote):
+        """return SELECT statement, built once per query shape"""
         if one and limit:
             raise Exception('one and limit parameters are mutually exclusive')
         if one:
             limit = 1
 
+        key = (
+            tuple(table.key for table in self._tables),
+            self._where, self._order, limit, offset, bool(for_update), quote,
+            self._seek, self._after is not None,
+        )
+        stmt = STATEMENTS.get(key)
+        if stmt is None:
+            stmt = self._build(limit, offset, for_update, quote)
+            STATEMENTS.put(key, stmt)
+        return stmt
+
+    def _build(self, limit, offset, for_update, quote):
+        """build SELECT statement"""
         stmt = 'SELECT '
         stmt += ', '.join(
             '{column} AS {cnt}_{alias}'.format(
@@ -116,14 +195,31 @@ class Query:
         )
         stmt += ' FROM '
         stmt += ' '.join(table.join(quote) for table in self._tables)
+        where = None
         if self._where:
-            self._where = self._where.replace('{TABLE.', '{TABLE_')
+            where = self._where.replace('{TABLE.', '{TABLE_')
             subs = dict(Q=quote)
             for qot in self._tables:
                 subs['TABLE_' + qot.table_name] = quote + qot.alias + quote
-            stmt += ' WHERE ' + self._where.format(**subs)
-        if self._order:
-            stmt += ' ORDER BY ' + self._order
+            where = where.format(**subs)
+        order = self._order
+        if self._seek:
+            keys, descending = self._seek
+            columns = [self._seek_column(key, quote) for key in keys]
+            if self._after is not None:
+                predicate = '{} {} {}'.format(
+                    columns[0] if len(columns) == 1 else
+                    '(' + ', '.join(columns) + ')',
+                    '<' if descending else '>',
+                    '%s' if len(columns) == 1 else
+                    '(' + ', '.join('%s' for _ in columns) + ')')
+                where = f'({where}) AND {predicate}' if where else predicate
+            order = ', '.join(
+                col + (' DESC' if descending else '') for col in columns)
+        if where:
+            stmt += ' WHERE ' + where
+        if order:
+            stmt += ' ORDER BY ' + order
         if limit:
             stmt += ' LIMIT %d' % int(limit)
         if offset:
@@ -132,40 +228,218 @@ class Query:
             stmt += ' FOR UPDATE'
         return stmt
 
+    def _seek_column(self, key, quote):
+        """return column expression for a seek key"""
+        if '.' in key:
+            alias, name = key.split('.', 1)
+            match = [t for t in self._tables if t.alias == alias]
+            if not match:
+                raise ValueError(f"'{alias}' does not match any tables")
+            table = match[0]
+        else:
+            table, name = self._tables[0], key
+        return _column(table, table.cls._m.field(name), quote)
+
+    def _seek_value(self, model, key):
+        """return the value of a seek key from a result model"""
+        if '.' in key:
+            alias, key = key.split('.', 1)
+            if alias != self._tables[0].alias:
+                model = model[alias]
+        return getattr(model, key)
+
+    def _args(self, args):
+        """return args with any seek values added"""
+        if self._after is None:
+            return args
+        if args is None:
+            args = ()
+        elif not isinstance(args, (list, tuple)):
+            args = (args,)
+        return tuple(args) + tuple(self._after)
+
     async def execute(self,  # pylint: disable=too-many-arguments
                       # pylint: disable=too-many-locals
                       cursor, args=None, one=False, limit=None,
-                      offset=None, for_update=False):
-        """execute query against database"""
-
+                      offset=None, for_update=False, as_=None):
+        """execute query against database
+
+           By default, each row is returned as a Model (with any joined
+           Models accessible by alias). For read-only results, "as_" skips
+           Model construction and change tracking:
+
+               as_="tuples"      - a tuple of field values
+               as_="dicts"       - a dict of field name: value
+               as_="namedtuples" - a namedtuple of field values
+
+           With joins, "tuples" and "namedtuples" rows contain one item for
+           each table (a namedtuple's attributes are the table aliases),
+           and a "dicts" row contains the primary table's fields plus one
+           dict for each joined table, keyed by alias. As with Models, an
+           outer joined table with no match is None.
+        """
+        convert = self._converter(as_)
         stmt = self._prepare(one, limit, offset, for_update, cursor.quote)
-        columns, values = await cursor.execute(stmt, args)
-        columns = [col.split('_', 1)[1] for col in columns]
+        columns, values = await cursor.execute(stmt, self._args(args))
+        rows = convert(columns, values)
+
+        if one:
+            rows = rows[0] if rows else None
+
+        return rows
+
+    async def stream(self,  # pylint: disable=too-many-arguments
+                     cursor, args=None, batch_size=1000, limit=None,
+                     offset=None, as_=None):
+        """execute query against database, yielding one model at a time
+
+           rows are read from the database batch_size at a time (see
+           Cursor.execute_stream), so that memory use is bounded no matter
+           how large the result; "as_" is the same as in execute
+        """
+        convert = self._converter(as_)
+        stmt = self._prepare(False, limit, offset, False, cursor.quote)
+        async for columns, values in cursor.execute_stream(
+                stmt, self._args(args), batch_size):
+            for model in convert(columns, values):
+                yield model
+
+    def _converter(self, as_):
+        """return function that converts result rows"""
+        if as_ is None:
+            return self._models
+        if as_ not in ('tuples', 'dicts', 'namedtuples'):
+            raise ValueError(f"invalid as_ value: '{as_}'")
+        return functools.partial(self._light_rows, as_)
+
+    def _layout(self):
+        """return (table, start, end, names, primary) for each table
+
+           start:end is the slice of a result row holding the table's
+           fields, names are the field names, and primary is the index of
+           the primary key in names (or None)
+
+           the layout only depends on the query's tables, so it is computed
+           once and cached
+        """
+        key = tuple(table.key for table in self._tables)
+        layout = LAYOUTS.get(key)
+        if layout is None:
+            layout = self._build_layout()
+            LAYOUTS.put(key, layout)
+        return layout
+
+    def _build_layout(self):
+        """build result row layout"""
+        layout = []
+        start = 0
+        for table in self._tables:
+            names = tuple(fld.name for fld in table._fields())
+            end = start + len(names)
+            primary = table._primary()
+            primary = None if primary is None else names.index(primary.name)
+            layout.append((table, start, end, names, primary))
+            start = end
+        return layout
+
+    def _light_rows(self, as_, _columns, values):
+        """convert result rows into tuples, dicts or namedtuples"""
+        layout = self._layout()
+        makers = [_row_maker(as_, table, names)
+                  for table, _, _, names, _ in layout]
+
+        if len(layout) == 1:
+            _, start, end, _, _ = layout[0]
+            make = makers[0]
+            return [make(row[start:end]) for row in values]
+
+        combine = _row_combiner(as_, layout)
+        return [combine(_split_row(layout, makers, row)) for row in values]
+
+    def _models(self, _columns, values):
+        """convert result rows into models
+
+           each row is split into tables using the precomputed layout, so
+           the result column names are never examined; models are created
+           with Model._hydrate, which trusts the values from the database
+        """
+        layout = self._layout()
+        table, start, end, _, _ = layout[0]
+        cls = table.cls
+
+        if len(layout) == 1:
+            return [cls._hydrate(row[start:end]) for row in values]
 
         rows = []
-        for rowdata in values:
-            tables = None
-            row = list(zip(columns, rowdata))
-            for table in self._tables:
-                val = dict(row[:table.column_count])
-                if val[table._primary().name] is None:
-                    obj = None
+        for row in values:
+            primary_table = None
+            for table, start, end, _, primary in layout:
+                data = row[start:end]
+                if primary is not None and data[primary] is None:
+                    obj = None  # outer join with no match
                 else:
-                    obj = table.cls(**val)
-                if tables is None:
+                    obj = table.cls._hydrate(data)
+                if primary_table is None:
+                    if obj is None:
+                        break
                     primary_table = obj
                     obj._s.tables = tables = {}
                 else:
                     tables[table.alias] = obj
-                row = row[table.column_count:]
             rows.append(primary_table)
 
-        if one:
-            rows = rows[0] if rows else None
-
         return rows
 
 
+def _row_maker(as_, table, names):
+    """return make(data) function for a table's light-weight row type
+
+       called once per table of a result, so that the namedtuple class is
+       looked up before the rows are converted
+    """
+    if as_ == 'tuples':
+        return tuple
+    if as_ == 'dicts':
+        def make(data):
+            return dict(zip(names, data))
+        return make
+    return _namedtuple(table.cls.__name__, names)._make
+
+
+def _row_combiner(as_, layout):
+    """return function that combines the per-table items of a joined row"""
+    if as_ == 'namedtuples':
+        return _namedtuple(
+            'Row', tuple(table.alias for table, *_ in layout))._make
+    if as_ == 'dicts':
+        aliases = [table.alias for table, *_ in layout[1:]]
+
+        def combine(items):
+            item = items[0]
+            item.update(zip(aliases, items[1:]))
+            return item
+        return combine
+    return tuple
+
+
+def _split_row(layout, makers, row):
+    """return a converted item for each table in layout"""
+    items = []
+    for (_, start, end, _, primary), make in zip(layout, makers):
+        data = row[start:end]
+        if items and primary is not None and data[primary] is None:
+            items.append(None)  # outer join with no match
+        else:
+            items.append(make(data))
+    return items
+
+
+@functools.lru_cache(maxsize=1000)
+def _namedtuple(name, fields):
+    """return (cached) namedtuple class"""
+    return collections.namedtuple(name, fields, rename=True)
+
+
 def get_class(item):
     """get class of model or QueryTable"""
     if isinstance(item, QueryTable):
@@ -185,13 +459,17 @@ class QueryTable:  # pylint: disable=too-many-instance-attributes
         self.cls = cls
         self.alias = alias or snake_to_camel(cls.__name__)
         self.table_name = alias or cls.__name__
-        self.column_count = len(cls._m.fields)
+        self.column_count = len(cls._m.db_read)
 
         self.join_type = join_type
         self.join_column = column
         self.join_table_name = join_table_name
         self.join_table_column = join_column_name
 
+        # everything that affects the SQL generated for this table
+        self.key = (cls, self.alias, self.table_name, join_type, column,
+                    join_table_name, join_column_name)
+
     def join(self, quote):
         """return join clause"""
         if self.join_type is None:
@@ -299,15 +577,14 @@ def _find_foreign_key_reference(table, tables):
        tables - a list or tuple of Models or QueryTables
     """
     try:
-        foreign = table._m.foreign
+        state = table._m
     except AttributeError as exc:
         raise TypeError('table must be a Model or QueryTable') from exc
-    if len(foreign) == 0:
+    if len(state.foreign) == 0:
         return None
     refs = [
-        (t, f.name) for f in foreign
-        for t in tables
-        if f.foreign == get_class(t)
+        (t, f.name) for t in tables
+        for f in state.references(get_class(t))
     ]
     if len(refs) == 0:
         return None
@@ -326,10 +603,10 @@ def _find_primary_key_reference(table, tables):
        table - a Model class
        tables - a list or tuple of Models or QueryTables
     """
+    target = get_class(table)
     refs = [
         (t, f.name) for t in tables
-        for f in t._m.foreign
-        if f.foreign == get_class(table)
+        for f in t._m.references(target)
     ]
     if len(refs) == 0:
         return None
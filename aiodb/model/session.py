@@ -0,0 +1,278 @@
+"""identity map and unit of work"""
+# pylint: disable=protected-access
+from aiodb.model.model import fields_to_update
+from aiodb.model.model import insert_many, update_many, delete_many
+
+
+class Session:
+    """identity map and unit of work bound to a cursor
+
+       Models loaded or queried through a Session are kept in an identity
+       map keyed by (Model class, primary key value): a row is represented
+       by one object, and repeated loads are served from memory.
+
+       Models are added with "add" and removed with "delete"; these, along
+       with any changed Models in the identity map, are written with
+       batched statements on "flush" (or "commit").
+
+       Notes:
+           1. Inserts are done parent tables first, and deletes child tables
+              first, using the foreign key references (Field.foreign)
+              between Model classes.
+
+           2. Foreign key values are not copied from parent to child Models;
+              if a parent's primary key is assigned by the database, set the
+              child's foreign key and add the child after a flush.
+
+           3. New Models without a primary key value are inserted in batches
+              if the database returns the inserted keys; otherwise, they are
+              inserted one row at a time, so that each is assigned
+              cursor.last_id(), unless "consecutive_keys" is True (see
+              insert_many).
+
+           4. Models without a primary key are not kept in the identity map.
+
+           5. Query results with joined tables are returned as JoinedRows,
+              so that the joins of a row don't change the mapped Model.
+    """
+
+    def __init__(self, cursor, consecutive_keys=False):
+        self.cursor = cursor
+        self.consecutive_keys = consecutive_keys
+        self.identity = {}  # {(Model class, primary key value): Model}
+        self.new = []  # Models to INSERT
+        self.pending = {}  # {id(Model): Model} for Models in "new"
+        self.deleted = []  # Models to DELETE
+
+    def __contains__(self, model):
+        return id(model) in self.pending or \
+            self.identity.get(_identity(model)) is model
+
+    def get(self, cls, key):
+        """return Model from the identity map or None"""
+        return self.identity.get((cls, cls._m.primary.parse(key)))
+
+    async def load(self, cls, key):
+        """Load a Model by primary key, using the identity map if possible"""
+        model = self.get(cls, key)
+        if model is None:
+            model = await cls.load(self.cursor, key)
+            if model is not None:
+                model = self.merge(model)
+        return model
+
+    async def query(self, query, args=None, **kwargs):
+        """execute a Query and merge the result Models into the identity map
+
+           arguments are the same as Query.execute; results in the identity
+           map replace the corresponding result Models, and rows with joined
+           tables are returned as JoinedRows (see merge)
+        """
+        result = await query.execute(self.cursor, args, **kwargs)
+        if kwargs.get('as_') is not None:
+            return result
+        if kwargs.get('one'):
+            return None if result is None else self.merge(result)
+        return [None if model is None else self.merge(model)
+                for model in result]
+
+    def merge(self, model):
+        """add a Model to the identity map and return the mapped Model
+
+           if the row is already in the identity map, that Model is returned
+           and "model" is discarded. If "model" has joined tables, the
+           joined Models are merged too, and a JoinedRow of the mapped Model
+           and the row's joined Models is returned, so that the mapped Model
+           isn't changed by the joins of each row.
+        """
+        key = _identity(model)
+        mapped = model if key is None else \
+            self.identity.setdefault(key, model)
+        tables = model._s.tables
+        if not tables:
+            return mapped
+        model._s.tables = None
+        return JoinedRow(mapped, {
+            alias: None if table is None else self.merge(table)
+            for alias, table in tables.items()})
+
+    def add(self, model):
+        """add a new Model to be inserted on flush"""
+        if model not in self:
+            self.new.append(model)
+            self.pending[id(model)] = model
+        return model
+
+    def delete(self, model):
+        """remove a Model to be deleted on flush"""
+        if self.pending.pop(id(model), None) is not None:
+            self.new = _without(self.new, [model])  # never inserted
+            return
+        self.identity.pop(_identity(model), None)
+        self.deleted.append(model)
+
+    def dirty(self):
+        """return list of Models in the identity map with changed fields"""
+        return [model for model in self.identity.values()
+                if fields_to_update(model)]
+
+    async def flush(self):
+        """write pending changes to the database
+
+           new Models are INSERTed, changed Models are UPDATEd and deleted
+           Models are DELETEd, each with batched statements. Models stay
+           pending until their statement succeeds.
+        """
+        inserts = _by_class(self.new)
+        deletes = _by_class(self.deleted)
+        order = _dependency_order(set(inserts) | set(deletes))
+
+        for cls in order:
+            if cls in inserts:
+                await self._insert(inserts[cls])
+
+        dirty = self.dirty()
+        if dirty:
+            await update_many(self.cursor, dirty)
+
+        for cls in reversed(order):
+            if cls in deletes:
+                models = deletes[cls]
+                await delete_many(self.cursor, models)
+                self.deleted = _without(self.deleted, models)
+
+    async def _insert(self, models):
+        """INSERT new Models of one class and add them to the identity map"""
+        generated = [model for model in models if _identity(model) is None]
+        forced = [model for model in models if _identity(model) is not None]
+        if generated:
+            await insert_many(
+                self.cursor, generated, consecutive_keys=self.consecutive_keys,
+                require_keys=True)
+        if forced:
+            await insert_many(self.cursor, forced, force_insert=True)
+        self.new = _without(self.new, models)
+        for model in models:
+            del self.pending[id(model)]
+            key = _identity(model)
+            if key is not None:
+                self.identity[key] = model
+
+    async def commit(self):
+        """flush pending changes in a transaction and commit
+
+           if the flush fails, the transaction is rolled back and the
+           pending changes, including the Models' changed fields, are
+           restored
+        """
+        state = self._save_state()
+        await self.cursor.start_transaction()
+        try:
+            await self.flush()
+        except Exception:
+            self._restore_state(state)
+            await self.cursor.rollback()
+            raise
+        await self.cursor.commit()
+
+    def _save_state(self):
+        """return a copy of the unit of work and of its Models' state"""
+        models = [
+            (model, list(model._s.values), dict(model._s.original or {}),
+             model._s.updated)
+            for model in self.new + self.dirty()]
+        return list(self.new), dict(self.pending), list(self.deleted), \
+            dict(self.identity), models
+
+    def _restore_state(self, state):
+        """restore a copy made by _save_state"""
+        self.new, self.pending, self.deleted, self.identity, models = state
+        for model, values, original, updated in models:
+            model._s.values = values
+            model._s.original = original or None
+            model._s.updated = updated
+
+    def clear(self):
+        """empty the identity map and discard pending changes"""
+        self.identity = {}
+        self.new = []
+        self.pending = {}
+        self.deleted = []
+
+
+class JoinedRow:
+    """a mapped Model and the joined Models of one query result row
+
+       Field values, methods and Model attributes are those of "model";
+       the joined Models are accessed with dot or bracket notation, as
+       with a Model returned by Query.execute.
+    """
+    __slots__ = ("model", "tables")
+
+    def __init__(self, model, tables):
+        object.__setattr__(self, "model", model)
+        object.__setattr__(self, "tables", tables)
+
+    def __getitem__(self, name):
+        return self.tables[name]
+
+    def __getattr__(self, name):
+        # only called when normal lookup fails
+        if name in self.tables:
+            return self.tables[name]
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.model, name, value)
+
+    def __repr__(self):
+        return f"JoinedRow({self.model!r})"
+
+
+def _by_class(models):
+    """return {Model class: [Model, ...]} for models"""
+    groups = {}
+    for model in models:
+        groups.setdefault(model.__class__, []).append(model)
+    return groups
+
+
+def _without(models, remove):
+    """return models that are not in remove"""
+    remove = set(id(model) for model in remove)
+    return [model for model in models if id(model) not in remove]
+
+
+def _identity(model):
+    """return identity map key for model or None"""
+    key = model._m.primary
+    if key is None:
+        return None
+    value = getattr(model, key.name)
+    if value is None:
+        return None
+    return type(model), value
+
+
+def _dependency_order(classes):
+    """return classes ordered so that referenced (parent) classes are first
+
+       references to classes not in "classes" and cycles are ignored
+    """
+    order = []
+    visiting = set()
+
+    def visit(cls):
+        if cls in order or cls in visiting:
+            return
+        visiting.add(cls)
+        for fld in cls._m.foreign:
+            parent = fld.foreign
+            if parent in classes:
+                visit(parent)
+        visiting.discard(cls)
+        order.append(cls)
+
+    for cls in sorted(classes, key=lambda cls: cls.__name__):
+        visit(cls)
+    return order
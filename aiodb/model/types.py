@@ -1,4 +1,11 @@
-"""manage generic database types"""
+"""manage generic database types
+
+A type is a class with a "parse" classmethod which normalizes a value.
+
+A type can also have a "native" attribute: a tuple of the python types that
+"parse" would return unchanged. Values of exactly these types which are
+read from the database are not parsed.
+"""
 import datetime
 
 
@@ -36,6 +43,7 @@ def Enum(*args):  # pylint: disable=invalid-name
 
 class Binary:  # pylint: disable=too-few-public-methods
     """represent a binary (not boolean) value"""
+    native = (bytes,)
 
     @classmethod
     def parse(cls, value):
@@ -45,6 +53,7 @@ class Binary:  # pylint: disable=too-few-public-methods
 
 class String:  # pylint: disable=too-few-public-methods
     """represent a string"""
+    native = (str,)
 
     @classmethod
     def parse(cls, value):
@@ -56,6 +65,7 @@ class String:  # pylint: disable=too-few-public-methods
 
 class Integer:  # pylint: disable=too-few-public-methods
     """represent an integer"""
+    native = (int,)
 
     @classmethod
     def parse(cls, value):
@@ -88,6 +98,7 @@ class Boolean:  # pylint: disable=too-few-public-methods
 
 class Date:  # pylint: disable=too-few-public-methods
     """represent a date"""
+    native = (datetime.date,)
 
     @classmethod
     def parse(cls, value):
@@ -113,6 +124,7 @@ def to_datetime(value):
 
 class Datetime:  # pylint: disable=too-few-public-methods
     """represent a datetime"""
+    native = (datetime.datetime,)
 
     @classmethod
     def parse(cls, value):
@@ -144,6 +156,7 @@ def to_time(value):
 
 class Time:  # pylint: disable=too-few-public-methods
     """represent a time interval"""
+    native = (datetime.time, datetime.timedelta)
 
     @classmethod
     def parse(cls, value):
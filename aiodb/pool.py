@@ -1,5 +1,15 @@
 """connection pool logic"""
+import asyncio
+import bisect
+import collections
+import contextlib
+import inspect
 import logging
+import random
+import time
+import traceback
+
+from aiodb.cursor import Cursor
 
 
 log = logging.getLogger(__name__)
@@ -9,15 +19,148 @@ class DatabaseReconnectError(Exception):
     """unable to reconnect to database"""
 
 
-class Pool:
+class PoolTimeoutError(TimeoutError):
+    """timed out waiting for a connection from the pool"""
+
+
+WAIT_BUCKETS = (.001, .005, .01, .05, .1, .5, 1, 5)
+
+
+class PoolStats:
+    """pool counters
+
+       counts - number of times each event has happened:
+
+           checkout        - a connection was returned by Pool.cursor
+           checkin         - a connection was closed by its user
+           create          - a pooled connection was created
+           overflow        - an on-demand connection was created
+           reconnect       - a connection failed ping and was replaced
+           replace         - a connection was replaced on close or expiry
+           replace_failure - a replacement connection could not be created
+           reap            - an idle connection was closed
+           leak            - a connection was held longer than leak_timeout
+           reclaim         - a leaked connection was closed by the pool
+           wait            - a caller waited for a connection
+           timeout         - a caller timed out waiting for a connection
+
+       wait_time      - total seconds spent waiting for a connection
+
+       wait_histogram - count of waits by duration; wait_histogram[n] is the
+                        number of waits no longer than buckets[n] seconds,
+                        and the last entry counts everything longer
+
+       uses           - number of checkouts by pool_index
+
+       listeners      - callables invoked as listener(event, value) on each
+                        event; value is the pool_index (if any) or, for
+                        wait, the seconds spent waiting
+    """
+
+    def __init__(self, buckets=WAIT_BUCKETS):
+        self.counts = collections.Counter()
+        self.wait_time = 0.0
+        self.buckets = buckets
+        self.wait_histogram = [0] * (len(buckets) + 1)
+        self.uses = collections.Counter()
+        self.listeners = []
+
+    def record(self, event, value=None):
+        """count an event and notify listeners"""
+        self.counts[event] += 1
+        for listener in self.listeners:
+            try:
+                listener(event, value)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("pool listener failed")
+
+    def record_wait(self, seconds):
+        """count a completed wait"""
+        self.wait_time += seconds
+        self.wait_histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.record("wait", seconds)
+
+    def record_checkout(self, connection):
+        """count a checkout"""
+        index = connection.pool_index
+        if index is not None:
+            self.uses[index] += 1
+        self.record("checkout", index)
+
+
+async def reset_connection(connection):
+    """restore a connection to a clean session state
+
+       any open transaction is rolled back and the most recent query
+       information is cleared; this works for a Cursor or anything that
+       looks like one
+    """
+    rollback = getattr(connection, "rollback", None)
+    if rollback is not None:
+        await rollback()
+    if hasattr(connection, "query"):
+        connection.query = None
+        connection.query_after = None
+
+
+@contextlib.asynccontextmanager
+async def releasing(cursor, close):
+    """yield cursor, and call close when done
+
+       if an exception occurred, any open transaction is rolled back first;
+       the rollback and close are shielded from cancellation
+    """
+    try:
+        yield cursor
+    except BaseException:
+        try:
+            await asyncio.shield(cursor.rollback())
+        except Exception:  # pylint: disable=broad-except
+            log.exception("unable to rollback released connection")
+        raise
+    finally:
+        await asyncio.shield(close())
+
+
+class Pool:  # pylint: disable=too-many-instance-attributes
     """connection pool"""
 
-    def __init__(self, connector):
+    def __init__(self, connector,  # pylint: disable=too-many-arguments
+                 max_size=0, min_size=0, recycle=False, max_age=None,
+                 max_uses=None, reset=reset_connection, max_overflow=None,
+                 timeout=None, lifo=False, ping_after=0, idle_timeout=None,
+                 max_age_jitter=0, leak_timeout=None, leak_reclaim=False):
+        # pylint: disable=too-many-locals
         self.connector = connector
-        self.pool = []
+        self.pool = collections.deque()  # idle connections, next out on right
+        self.max_size = max_size
+        self.min_size = min_size
+        self.indexes = set()  # pool_index of each open pooled connection
+        self.lifo = lifo
+        self.recycle = recycle
+        self.max_age = max_age
+        self.max_age_jitter = max_age_jitter
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses
+        self.reset = reset
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.maintenance = None  # background maintenance task
+
+        self.leak_timeout = leak_timeout
+        self.leak_reclaim = leak_reclaim
+
+        self.overflow = 0  # number of open on-demand connections
+        self.in_use = {}  # checked out connections by id
+        self.waiters = collections.deque()  # FIFO of futures
+        self.stats = PoolStats()
 
     @classmethod
-    async def setup(cls, connector, size=10):
+    async def setup(cls, connector,  # pylint: disable=too-many-arguments
+                    size=None, min_size=None, max_size=None, concurrency=10,
+                    check_interval=None, **kwargs):
+        # pylint: disable=too-many-locals
         """setup a new connection pool
 
            connector - an async function that returns one open connection to
@@ -26,71 +169,599 @@ class Pool:
                        a connection must support a ping():bool and a close()
                        method in order to be managed by the pool
 
-           size      - the number of connections in the pool
+           size        - shorthand for min_size=max_size=size
+
+           min_size    - the number of connections created at setup
+                         (default max_size); must not be more than max_size
+
+           max_size    - the maximum number of connections in the pool; the
+                         pool grows past min_size on demand (default 10)
+
+           concurrency - the maximum number of connections created at the
+                         same time during setup
+
+           check_interval - if specified, run a background task every
+                            check_interval seconds which closes idle and
+                            expired connections (see reap), and pings idle
+                            connections and replaces dead ones (see check;
+                            this requires ping_after)
+
+           kwargs:
+
+           recycle      - if True, a closed pooled connection is reset and
+                          returned to the pool instead of being replaced
+
+           max_age      - seconds after which a connection is replaced
+                          instead of reset (recycle) or while idle (reap)
+
+           max_age_jitter - fraction (0 to 1) by which max_age is randomly
+                            shortened for each connection, so that
+                            connections created together don't all expire
+                            together
+
+           max_uses     - number of checkouts after which a connection is
+                          replaced instead of reset (recycle) or while idle
+                          (reap)
+
+           reset        - (recycle only) async function that restores a
+                          connection to a clean session state
+
+           max_overflow - maximum number of on-demand connections allowed
+                          when the pool is exhausted (None means no limit)
+
+           timeout      - seconds to wait for a connection when the pool and
+                          overflow are exhausted (None means wait forever)
+
+           lifo         - if True, the most recently released connection is
+                          the next one used; this keeps busy connections warm
+                          and lets the rest sit idle
+
+           ping_after   - a pooled connection is pinged at checkout only if
+                          it has been idle for at least ping_after seconds
+                          (0 means ping at every checkout)
+
+           idle_timeout - seconds after which an idle connection is closed,
+                          as long as the pool keeps min_size connections
+
+           leak_timeout - seconds after which a checked out connection is
+                          reported as leaked, along with the stack where it
+                          was checked out (see check_leaks); requires
+                          check_interval
+
+           leak_reclaim - if True, a leaked connection is closed and its
+                          slot is returned to the pool
 
            Notes:
-               * a connection pool will create "size" new connections at init
+               * a connection pool will create "min_size" new connections at
+                 init; a connection that can't be created is logged and
+                 skipped, unless all of them fail
                * when a pooled connection is closed, it will be replaced by a
-                 new connection which is added FIFO to the pool
+                 new connection which is added FIFO (or LIFO) to the pool
+               * in recycle mode, a connection is only replaced if the reset
+                 fails, if it is past max_age or max_uses, or if it is closed
+                 with close(replace=True)
+               * when a connection is released and there are callers waiting,
+                 the connection is handed directly to the longest waiting
+                 caller
         """
-        self = cls(connector)
+        if max_size is None:
+            max_size = 10 if size is None else size
+        if min_size is None:
+            min_size = max_size if size is None else size
+        if min_size > max_size:
+            raise ValueError("min_size must not be more than max_size")
+        if kwargs.get("leak_timeout") is not None and not check_interval:
+            raise ValueError("leak_timeout requires check_interval")
+        self = cls(
+            connector, max_size=max_size, min_size=min_size, **kwargs)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _create():
+            async with semaphore:
+                return await self._grow()  # pylint: disable=protected-access
 
-        for index in range(size):
-            log.debug("creating pooled connection %d", index + 1)
-            con = await connector()
-            con.pool_index = index + 1
-            con.close = self.pooled_connection_close(con)
-            self.pool.insert(0, con)
+        result = await asyncio.gather(
+            *[_create() for _ in range(min_size)], return_exceptions=True)
+        errors = [con for con in result if isinstance(con, Exception)]
+        for error in errors:
+            log.warning("unable to create pooled connection: %s", error)
+        if errors and len(errors) == len(result):
+            raise errors[0]
+        for con in sorted(
+                (con for con in result if not isinstance(con, Exception)),
+                key=lambda con: con.pool_index):
+            self.pool.appendleft(con)
+
+        if check_interval:
+            self.maintenance = asyncio.create_task(
+                self._maintain(check_interval))
 
         return self
 
+    async def close(self):
+        """stop background maintenance and close idle pooled connections"""
+        if self.maintenance:
+            self.maintenance.cancel()
+            self.maintenance = None
+        while self.pool:
+            connection = self.pool.pop()
+            self.indexes.discard(connection.pool_index)
+            try:
+                await connection.raw_close()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("unable to close pooled connection %d",
+                              connection.pool_index)
+
+    async def _maintain(self, interval):
+        """periodically run pool maintenance"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap()
+                await self.check()
+                await self.check_leaks()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("pool maintenance failed")
+
+    async def check_leaks(self):
+        """report (and optionally reclaim) connections held too long
+
+           a connection checked out for longer than leak_timeout is logged
+           once, with the stack where it was checked out; if leak_reclaim is
+           True, the connection is closed and its slot is made available.
+           A later close() of a reclaimed connection does nothing.
+        """
+        if self.leak_timeout is None:
+            return
+        now = time.monotonic()
+        for connection in list(self.in_use.values()):
+            if now - connection.pool_checkout_time < self.leak_timeout:
+                continue
+            if not connection.pool_leaked:
+                connection.pool_leaked = True
+                log.warning(
+                    "connection %s held for %.1f seconds, checked out at:\n%s",
+                    connection.pool_index,
+                    now - connection.pool_checkout_time,
+                    "".join(connection.pool_checkout_stack.format()))
+                self.stats.record("leak", connection.pool_index)
+            if self.leak_reclaim:
+                await self._reclaim(connection)
+
+    async def _reclaim(self, connection):
+        """close a leaked connection and free its slot"""
+        del self.in_use[id(connection)]
+        self.stats.record("reclaim", connection.pool_index)
+        if connection.pool_index is None:
+            self.overflow -= 1
+        else:
+            self.indexes.discard(connection.pool_index)
+        try:
+            await connection.raw_close()
+        except Exception:  # pylint: disable=broad-except
+            log.exception("unable to close leaked connection")
+        await self._refill()
+
+    async def _refill(self):
+        """use newly freed capacity to serve a waiting caller"""
+        if not self.waiters:
+            return
+        try:
+            if self.size < self.max_size:
+                con = await self._grow()
+            else:
+                con = await self._on_demand()
+        except Exception:  # pylint: disable=broad-except
+            log.exception("unable to open connection for waiting caller")
+            return
+        await self._pass_along(con)
+
+    async def _pass_along(self, connection):
+        """give an unused connection to a waiter, or put it away
+
+           a pooled connection goes back to the pool; an on-demand
+           connection is closed
+        """
+        if self._handoff(connection):
+            return
+        if connection.pool_index is None:
+            self.overflow -= 1
+            await connection.raw_close()
+        else:
+            self._release(connection)
+
+    async def reap(self):
+        """close idle connections and replace expired ones
+
+           the longest idle connections past idle_timeout are closed, as
+           long as the pool keeps min_size connections; idle connections
+           past max_age or max_uses are replaced with new connections
+        """
+        now = time.monotonic()
+        idle = []
+        if self.idle_timeout is not None:
+            excess = self.size - self.min_size
+            for con in sorted(self.pool, key=lambda con: con.pool_idle_since):
+                if excess <= 0 or \
+                        now - con.pool_idle_since < self.idle_timeout:
+                    break
+                idle.append(con)
+                excess -= 1
+        removed = set(id(con) for con in idle)
+        expired = [
+            con for con in self.pool
+            if id(con) not in removed and self._is_expired(con)]
+        if not idle and not expired:
+            return
+        removed.update(id(con) for con in expired)
+        self.pool = collections.deque(
+            con for con in self.pool if id(con) not in removed)
+
+        for connection in idle:
+            log.debug("closing idle pooled connection %d",
+                      connection.pool_index)
+            self.stats.record("reap", connection.pool_index)
+            self.indexes.discard(connection.pool_index)
+            try:
+                await connection.raw_close()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("unable to close pooled connection %d",
+                              connection.pool_index)
+
+        await asyncio.gather(*[self._rotate(con) for con in expired])
+
+    async def _rotate(self, connection):
+        """replace an expired idle connection"""
+        log.debug("rotating pooled connection %d", connection.pool_index)
+        try:
+            connection = await self._replace(connection)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("dropping expired pooled connection %d",
+                          connection.pool_index)
+            self.stats.record("replace_failure", connection.pool_index)
+            self.indexes.discard(connection.pool_index)
+            await self._refill()
+            return
+        self._release(connection)
+
+    async def check(self):
+        """ping idle connections and replace dead ones
+
+           only connections idle for at least ping_after seconds are
+           checked; while a connection is being checked, it is not
+           available for checkout. If ping_after is 0, every checkout
+           pings anyway, so nothing is checked here.
+        """
+        if not self.ping_after:
+            return
+        now = time.monotonic()
+        stale = [
+            con for con in self.pool
+            if now - con.pool_idle_since >= self.ping_after]
+        if not stale:
+            return
+        self.pool = collections.deque(
+            con for con in self.pool
+            if now - con.pool_idle_since < self.ping_after)
+        await asyncio.gather(*[self._check(con) for con in stale])
+
+    @staticmethod
+    async def _ping(connection):
+        """return True if connection is alive; a failed ping is not"""
+        try:
+            return await connection.ping()
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+    async def _check(self, connection):
+        """ping an idle connection and return it to the pool"""
+        if not await self._ping(connection):
+            try:
+                connection = await self._reconnect(connection)
+            except DatabaseReconnectError:
+                log.warning("dropping dead pooled connection %d",
+                            connection.pool_index)
+                self.stats.record("replace_failure", connection.pool_index)
+                self.indexes.discard(connection.pool_index)
+                await self._refill()
+                return
+        self._release(connection)
+
+    @property
+    def size(self):
+        """return the number of open pooled connections"""
+        return len(self.indexes)
+
+    @property
+    def queue_depth(self):
+        """return the number of callers waiting for a connection"""
+        return len(self.waiters)
+
+    def add_listener(self, listener):
+        """call listener(event, value) on each pool event (see PoolStats)"""
+        self.stats.listeners.append(listener)
+
+    def snapshot(self):
+        """return a dict of pool gauges and counters
+
+           "pending" is the number of open or opening connections which are
+           neither idle nor in use: being checked out, pinged by check,
+           rotated by reap, or created
+        """
+        stats = self.stats
+        idle = len(self.pool)
+        in_use = len(self.in_use)
+        return {
+            "size": self.size,
+            "idle": idle,
+            "in_use": in_use,
+            "pending": self.size + self.overflow - idle - in_use,
+            "overflow": self.overflow,
+            "waiting": len(self.waiters),
+            "counts": dict(stats.counts),
+            "wait_time": stats.wait_time,
+            "wait_histogram": dict(zip(
+                stats.buckets + (float("inf"),), stats.wait_histogram)),
+            "uses": dict(stats.uses),
+        }
+
     async def cursor(self):
         """return a database connection
 
-           if all connections in the pool are in use, a new on-demand
-           connection will be established, but not added to the pool
+           if all connections in the pool are in use, and the pool is not
+           at max_size, a new pooled connection is added; otherwise a new
+           on-demand connection will be established, but not added to the
+           pool; once max_overflow on-demand connections are open, the
+           caller waits for a connection to be released
         """
+        if not self.pool:
+            if self.size < self.max_size:
+                connection = await self._grow()
+                self._checkout(connection)
+                return connection
+            log.debug("connection pool exhausted")
+            if self.max_overflow is None or \
+                    self.overflow < self.max_overflow:
+                connection = await self._on_demand()
+                self._checkout(connection)
+                return connection
+            return await self._wait()
+
+        connection = self.pool.pop()
         try:
-            connection = self.pool.pop()
-            if not await connection.ping():
+            idle = time.monotonic() - connection.pool_idle_since
+            if idle >= self.ping_after and not await self._ping(connection):
                 connection = await self._reconnect(connection)
+        except BaseException:  # including cancellation
+            # keep the connection (and its index); it is pinged, and
+            # reconnected if necessary, at a later checkout
+            self.pool.appendleft(connection)
+            raise
+        self._checkout(connection)
+        return connection
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        """checkout a connection as a Cursor, and release it when done
+
+           async with pool.acquire() as cursor:
+               ...
+
+           the connection is bound to a Cursor (unless it is one already).
+           On exit, any open transaction is rolled back if an exception
+           occurred, and the connection is returned to the pool, even if
+           the task is cancelled.
+        """
+        connection = await self.cursor()
+        if isinstance(connection, Cursor):
+            cursor = connection
+        else:
+            cursor = Cursor.bind(connection)
+        async with releasing(cursor, connection.close):
+            yield cursor
+
+    def _checkout(self, connection):
+        """note the use of a connection"""
+        self.stats.record_checkout(connection)
+        self.in_use[id(connection)] = connection
+        if self.leak_timeout is not None:
+            connection.pool_checkout_time = time.monotonic()
+            # formatting (and source line lookup) is left to check_leaks
+            stack = traceback.StackSummary.extract(
+                traceback.walk_stack(inspect.currentframe().f_back.f_back),
+                lookup_lines=False)
+            stack.reverse()
+            connection.pool_checkout_stack = stack
+            connection.pool_leaked = False
+        if connection.pool_index is not None:
+            connection.pool_uses += 1
             log.debug("using pooled connection %d", connection.pool_index)
-        except IndexError:
-            log.debug("connection pool exhausted")
-            connection = await self.connector()
-        except DatabaseReconnectError:
-            self.pool.insert(0, connection)
+
+    async def _on_demand(self):
+        """return a new connection which is not part of the pool"""
+        self.overflow += 1
+        try:
+            con = await self.connector()
+        except BaseException:  # including cancellation
+            self.overflow -= 1
+            raise
+        self.stats.record("overflow")
+        con.pool_index = None
+        con.raw_close = con.close
+        con.close = self.overflow_connection_close(con)
+        return con
+
+    async def _wait(self):
+        """wait for a connection to be released"""
+        log.debug("waiting for connection, queue depth %d",
+                  len(self.waiters) + 1)
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            connection = await asyncio.wait_for(
+                asyncio.shield(waiter), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done():
+                # a connection arrived as we gave up; pass it along
+                await self._pass_along(waiter.result())
+            else:
+                waiter.cancel()
+                self.waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.stats.record("timeout")
+                raise PoolTimeoutError(
+                    "timed out waiting for connection") from exc
             raise
+        finally:
+            self.stats.record_wait(time.monotonic() - start)
+        self._checkout(connection)
         return connection
 
+    def _handoff(self, connection):
+        """give connection to the longest waiting caller, if any"""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return True
+        return False
+
+    def _release(self, connection):
+        """return a pooled connection to a waiter or to the pool"""
+        if not self._handoff(connection):
+            connection.pool_idle_since = time.monotonic()
+            if self.lifo:
+                self.pool.append(connection)
+            else:
+                self.pool.appendleft(connection)
+
+    async def _grow(self):
+        """add a new connection to the pool"""
+        index = 1
+        while index in self.indexes:
+            index += 1
+        self.indexes.add(index)  # reserve index while connecting
+        log.debug("creating pooled connection %d", index)
+        try:
+            con = await self.connector()
+        except BaseException:  # including cancellation
+            self.indexes.discard(index)
+            raise
+        self.stats.record("create", index)
+        return self._pooled(con, index)
+
+    def _pooled(self, connection, index):
+        """prepare a new connection for use in the pool"""
+        connection.pool_index = index
+        connection.pool_created = connection.pool_idle_since = \
+            time.monotonic()
+        if self.max_age is None:
+            connection.pool_expires = None
+        else:
+            jitter = random.random() * self.max_age_jitter
+            connection.pool_expires = \
+                connection.pool_created + self.max_age * (1 - jitter)
+        connection.pool_uses = 0
+        connection.close = self.pooled_connection_close(connection)
+        return connection
+
+    def _is_expired(self, connection):
+        """return True if connection is past max_age or max_uses"""
+        if self.max_uses is not None:
+            if connection.pool_uses >= self.max_uses:
+                return True
+        if connection.pool_expires is not None:
+            if time.monotonic() >= connection.pool_expires:
+                return True
+        return False
+
     async def _replace(self, connection):
         """replace connection with a new connection"""
         await connection.raw_close()
         con = await self.connector()
-        con.pool_index = connection.pool_index
-        con.close = self.pooled_connection_close(con)
-        return con
+        self.stats.record("replace", connection.pool_index)
+        return self._pooled(con, connection.pool_index)
+
+    async def _recycle(self, connection):
+        """reset connection and return True, or False if it can't be reused"""
+        if self._is_expired(connection):
+            return False
+        try:
+            await self.reset(connection)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("unable to reset pooled connection %d",
+                          connection.pool_index)
+            return False
+        return True
 
     def pooled_connection_close(self, connection):
         """close connection and return it to the pool"""
         connection.raw_close = connection.close
 
-        async def _close():
-            """close connection and replace with new connection"""
+        async def _close(replace=False):
+            """return connection to the pool
+
+               in recycle mode, the connection is reset and reused unless
+               "replace" is True; otherwise, it is replaced with a new
+               connection
+            """
+            if self.in_use.pop(id(connection), None) is None:
+                return  # already closed or reclaimed
+            self.stats.record("checkin", connection.pool_index)
+            if self.recycle and not replace:
+                if await self._recycle(connection):
+                    log.debug("recycling pooled connection %d",
+                              connection.pool_index)
+                    self._release(connection)
+                    return
             try:
                 log.debug("replacing pooled connection %d",
                           connection.pool_index)
                 con = await self._replace(connection)
-                self.pool.insert(0, con)
+                self._release(con)
             except Exception:  # pylint: disable=broad-except
-                # something didn't work, put the old connection in the pool
-                self.pool.insert(0, connection)
+                # the old connection may already be closed; drop it
+                log.exception("dropping pooled connection %d",
+                              connection.pool_index)
+                self.stats.record("replace_failure", connection.pool_index)
+                self.indexes.discard(connection.pool_index)
+                await self._refill()
+
+        return _close
+
+    def overflow_connection_close(self, connection):
+        """hand on-demand connection to a waiter or close it"""
+
+        async def _close(replace=False):
+            """close on-demand connection unless a caller is waiting
+
+               a connection handed to a waiting caller is reset first; if
+               the reset fails, the connection is closed
+            """
+            if self.in_use.pop(id(connection), None) is None:
+                return  # already closed or reclaimed
+            self.stats.record("checkin")
+            if not replace and self.waiters:
+                try:
+                    await self.reset(connection)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("unable to reset on-demand connection")
+                else:
+                    if self._handoff(connection):
+                        log.debug("handing off on-demand connection")
+                        return
+            self.overflow -= 1
+            await connection.raw_close()
+            await self._refill()
 
         return _close
 
     async def _reconnect(self, connection):
         """reconnect a pooled connection"""
         log.debug("reconnecting pooled connection %d", connection.pool_index)
+        self.stats.record("reconnect", connection.pool_index)
         try:
             return await self._replace(connection)
         except Exception as exc:  # pylint: disable=broad-except
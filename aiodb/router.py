@@ -0,0 +1,221 @@
+"""read/write splitting across primary and replica pools"""
+import contextlib
+import logging
+import re
+import time
+
+from aiodb.cursor import Cursor
+from aiodb.pool import PoolTimeoutError, releasing
+
+
+log = logging.getLogger(__name__)
+
+
+LOCKING = re.compile(
+    r"\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b|\bLOCK\s+IN\b",
+    re.IGNORECASE)
+
+
+def is_read(query):
+    """return True if query is a non-locking SELECT"""
+    return query.lstrip()[:6].upper() == "SELECT" and \
+        LOCKING.search(query) is None
+
+
+def bind(connection):
+    """return connection as a Cursor"""
+    if isinstance(connection, Cursor):
+        return connection
+    return Cursor.bind(connection)
+
+
+class Replica:  # pylint: disable=too-few-public-methods
+    """a replica Pool and its routing state"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.outstanding = 0  # statements in progress
+        self.ejected_until = 0  # monotonic time when replica is usable
+
+    @property
+    def is_healthy(self):
+        """return True if the replica is not ejected"""
+        return self.ejected_until <= time.monotonic()
+
+
+class Router:
+    """route statements to a primary Pool or to replica Pools
+
+       primary    - Pool for writes, locking reads and transactions
+       replicas   - list of Pools for plain reads
+       quote      - quote character of the underlying connections
+       eject_time - seconds a replica is skipped after it can't be
+                    reached (a connect or ping failure; a checkout that
+                    times out on a busy replica only sends that read to
+                    the primary)
+
+       Notes:
+           * a read (a SELECT without a FOR [NO KEY] UPDATE, FOR [KEY]
+             SHARE or LOCK IN clause) outside of a transaction goes to the
+             replica with the fewest outstanding statements; everything
+             else goes to the primary
+           * if no replica is healthy, reads go to the primary
+           * the Cursor returned by acquire can be used anywhere a Cursor
+             is used, for instance Model.save or Query.execute
+    """
+
+    def __init__(self, primary, replicas=(), quote='`', eject_time=30):
+        self.primary = primary
+        self.replicas = [Replica(pool) for pool in replicas]
+        self.quote = quote
+        self.eject_time = eject_time
+        self._next = 0  # rotates ties between equally loaded replicas
+
+    def cursor(self):
+        """return a new RoutedCursor"""
+        return RoutedCursor(self)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        """yield a RoutedCursor, and release its connections when done
+
+           On exit, any open transaction is rolled back if an exception
+           occurred.
+        """
+        cursor = self.cursor()
+        async with releasing(cursor, cursor.close):
+            yield cursor
+
+    def choose(self):
+        """return the healthy replica with the fewest outstanding statements
+
+           return None if there are no healthy replicas
+        """
+        count = len(self.replicas)
+        best = None
+        for offset in range(count):
+            replica = self.replicas[(self._next + offset) % count]
+            if not replica.is_healthy:
+                continue
+            if best is None or replica.outstanding < best.outstanding:
+                best = replica
+        if count:
+            self._next = (self._next + 1) % count
+        return best
+
+    def eject(self, replica):
+        """stop routing to replica for eject_time seconds"""
+        log.warning("ejecting replica for %s seconds", self.eject_time)
+        replica.ejected_until = time.monotonic() + self.eject_time
+
+
+class RoutedCursor(Cursor):
+    """Cursor which routes each statement to a primary or replica Pool
+
+       A primary connection is checked out on first use and held until
+       close, so that transactions and last_id work as expected. A replica
+       connection is checked out for a single statement.
+    """
+
+    def __init__(self, router):
+        super().__init__(
+            execute=None, ping=self._ping, close=self._close,
+            serialize=None, last_id=self._last_id,
+            last_message=self._last_message, quote=router.quote)
+        self.router = router
+        self._primary = None  # primary connection
+        self._cursor = None  # primary connection as a Cursor
+        self._message = None  # last_message from most recent replica read
+
+    async def _primary_cursor(self):
+        if self._cursor is None:
+            self._primary = await self.router.primary.cursor()
+            self._cursor = bind(self._primary)
+        return self._cursor
+
+    async def execute(self, query, args=None, **kwargs):
+        """Execute an arbitrary SQL command on the primary or a replica
+
+           See Cursor.execute.
+        """
+        self.query = query
+        self.query_after = None
+        if self._transaction_depth == 0 and is_read(query):
+            replica = self.router.choose()
+            if replica is not None:
+                try:
+                    connection = await replica.pool.cursor()
+                except PoolTimeoutError:
+                    log.debug("replica busy, reading from primary")
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("unable to connect to replica")
+                    self.router.eject(replica)
+                else:
+                    return await self._replica_execute(
+                        replica, connection, query, args, kwargs)
+
+        cursor = await self._primary_cursor()
+        try:
+            return await cursor.execute(query, args, **kwargs)
+        finally:
+            self.query_after = cursor.query_after
+            self._message = None
+
+    async def _transaction(self, command):
+        """run transaction commands through the primary Cursor
+
+           the primary Cursor tracks the transaction too, so that its
+           rollback (for instance, in a pool reset) works
+        """
+        cursor = await self._primary_cursor()
+        self.query = command
+        try:
+            if command == "BEGIN":
+                await cursor.start_transaction()
+            elif command == "COMMIT":
+                await cursor.commit()
+            else:
+                await cursor.rollback()
+        finally:
+            self.query_after = cursor.query_after
+            self._message = None
+
+    async def _replica_execute(  # pylint: disable=too-many-arguments
+            self, replica, connection, query, args, kwargs):
+        replica.outstanding += 1
+        try:
+            cursor = bind(connection)
+            result = await cursor.execute(query, args, **kwargs)
+            self.query_after = cursor.query_after
+            self._message = cursor.last_message()
+            return result
+        finally:
+            replica.outstanding -= 1
+            await connection.close()
+
+    async def _ping(self):
+        if self._cursor is None:
+            return True
+        return await self._cursor.ping()
+
+    async def _close(self):
+        if self._transaction_depth and self._cursor is not None:
+            # don't return a connection with an open transaction
+            try:
+                await self.rollback()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("unable to rollback routed cursor")
+        self._transaction_depth = 0
+        if self._primary is not None:
+            primary, self._primary, self._cursor = self._primary, None, None
+            await primary.close()
+
+    def _last_id(self):
+        if self._cursor is None:
+            return None
+        return self._cursor.last_id()
+
+    def _last_message(self):
+        if self._message is not None or self._cursor is None:
+            return self._message
+        return self._cursor.last_message()
@@ -1,4 +1,5 @@
 """utilities"""
+import collections
 import importlib
 
 
@@ -16,3 +17,41 @@ def snake_to_camel(name):
     return name[0].lower() + "".join(
         "_" + ch.lower() if ch.isupper() else ch
         for ch in name[1:])
+
+
+class LRUCache:
+    """dict-like cache that holds at most "size" items
+
+       the least recently used item is discarded when the cache is full
+    """
+
+    def __init__(self, size=100):
+        self.size = size
+        self.data = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """return the value for key (and mark it as recently used)"""
+        try:
+            value = self.data[key]
+        except KeyError:
+            return default
+        self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """add value for key, returning the discarded value, if any"""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.size:
+            return self.data.popitem(last=False)[1]
+        return None
+
+    def clear(self):
+        """discard all items"""
+        self.data.clear()
@@ -0,0 +1,143 @@
+"""test cursor operations"""
+# pylint: disable=protected-access
+from unittest import mock
+
+import pytest
+
+from aiodb.cursor import Cursor, Raw
+
+
+def prepared_cursor(prepare=True, size=100):
+    """return a prepared-mode cursor with mocked attributes"""
+    handles = iter(range(1000))
+    return Cursor(
+        execute=mock.AsyncMock(),
+        ping=mock.AsyncMock(),
+        close=mock.AsyncMock(),
+        serialize=str,
+        last_id=mock.Mock(return_value=100),
+        last_message=mock.Mock(return_value="test message"),
+        quote="'",
+        transactions=False,
+        execute_prepared=mock.AsyncMock(return_value=((), ())),
+        prepare=mock.AsyncMock(side_effect=lambda query: next(handles))
+        if prepare else None,
+        deallocate=mock.AsyncMock(),
+        prepared=True,
+        statement_cache_size=size,
+    )
+
+
+def test_prepared_requires_hook():
+    """prepared mode needs an execute_prepared hook"""
+    with pytest.raises(ValueError):
+        Cursor(None, None, None, None, None, None, prepared=True)
+
+
+def test_prepared(run):
+    """query and params are passed separately"""
+    cursor = prepared_cursor(prepare=False)
+    run(cursor.execute, "SELECT %s, %s", (1, "a"), one=True)
+    cursor._execute.assert_not_called()
+    cursor._execute_prepared.assert_called_once_with(
+        "SELECT %s, %s", (1, "a"), one=True)
+    assert cursor.query_after == "SELECT %s, %s"
+
+
+def test_prepared_raw(run):
+    """Raw args are substituted into the query"""
+    cursor = prepared_cursor(prepare=False)
+    run(cursor.execute, "SELECT %s, %s", (Raw("NOW()"), 1))
+    cursor._execute_prepared.assert_called_once_with(
+        "SELECT NOW(), %s", (1,))
+
+
+def test_prepared_cache(run):
+    """prepared statement handles are cached by query"""
+    cursor = prepared_cursor()
+    run(cursor.execute, "SELECT %s", 1)
+    run(cursor.execute, "SELECT %s", 2)
+    cursor._prepare.assert_called_once_with(
+        "SELECT %s")
+    cursor._execute_prepared.assert_called_with(
+        0, (2,))
+
+
+def test_prepared_cache_evict(run):
+    """least recently used statement handle is deallocated"""
+    cursor = prepared_cursor(size=2)
+    run(cursor.execute, "SELECT 1")
+    run(cursor.execute, "SELECT 2")
+    run(cursor.execute, "SELECT 1")
+    run(cursor.execute, "SELECT 3")
+    cursor._deallocate.assert_called_once_with(1)
+    assert "SELECT 1" in cursor.statements
+    assert "SELECT 2" not in cursor.statements
+
+
+def test_bind_prepared():
+    """bind picks up optional prepared statement hooks"""
+    connection = mock.Mock()
+    cursor = Cursor.bind(connection, prepared=True)
+    assert cursor.prepared
+    assert cursor._execute_prepared == connection.execute_prepared
+    assert cursor._prepare == connection.prepare
+
+
+def streaming(batches):
+    """return a fake stream hook that yields batches"""
+    calls = []
+
+    async def stream(query, batch_size):
+        calls.append((query, batch_size))
+        for rows in batches:
+            yield ('a', 'b'), rows
+
+    stream.calls = calls
+    return stream
+
+
+def test_iterate(cursor, run):
+    """rows are read incrementally from the stream hook"""
+    cursor._stream = streaming([[(1, 2), (3, 4)], [(5, 6)]])
+
+    async def test():
+        return [row async for row in cursor.iterate(
+            "SELECT %s", 'x', batch_size=2)]
+
+    rows = run(test)
+    assert [(row.a, row['b']) for row in rows] == [(1, 2), (3, 4), (5, 6)]
+    assert cursor._stream.calls == [("SELECT x", 2)]
+    assert cursor.query_after == "SELECT x"
+    cursor._execute.assert_not_called()
+
+
+def test_iterate_without_stream(cursor, run):
+    """without a stream hook, the whole result is read by execute"""
+    cursor._execute.return_value = (('a',), [(1,), (2,), (3,)])
+
+    async def test():
+        return [batch async for batch in cursor.execute_stream(
+            "SELECT 1", batch_size=2)]
+
+    assert run(test) == [(('a',), [(1,), (2,)]), (('a',), [(3,)])]
+
+
+def test_select(cursor, run):
+    """rows allow dot and bracket access by column name"""
+    cursor._execute.return_value = (
+        ('id', 'count'), [(1, 10), (2, 20)])
+    rows = run(cursor.select, "SELECT id, COUNT(*) AS count")
+    assert [(row.id, row['count']) for row in rows] == [(1, 10), (2, 20)]
+    assert rows[0].count == 10
+    assert repr(rows[1]) == "{'id': 2, 'count': 20}"
+    with pytest.raises(AttributeError):
+        _ = rows[0].name
+    with pytest.raises(KeyError):
+        _ = rows[0]['name']
+
+    row = run(cursor.select, "SELECT 1", one=True)
+    assert row.id == 1
+
+    cursor._execute.return_value = (('id',), [])
+    assert run(cursor.select, "SELECT 1") is None
@@ -1,4 +1,8 @@
 """verify delete operation"""
+# pylint: disable=protected-access
+import pytest
+
+from aiodb import delete_many
 from tests.test_save import MockTable
 
 
@@ -12,3 +16,24 @@ def test_delete(cursor, run):
         "DELETE FROM 'tester' WHERE 'the_key'=%s"
     assert cursor.query_after == \
         "DELETE FROM 'tester' WHERE 'the_key'=100"
+
+
+def test_delete_many(cursor, run):
+    """verify batched delete by models and keys"""
+
+    tests = [MockTable(the_key=1, name='a'), MockTable(the_key=2, name='b')]
+    run(delete_many, cursor, tests + [3, 4, 5], model=MockTable, batch_size=4)
+    assert cursor._execute.call_count == 2
+    assert cursor._execute.call_args_list[0].args[0] == \
+        "DELETE FROM 'tester' WHERE 'the_key' IN (1,2,3,4)"
+    assert cursor.query == \
+        "DELETE FROM 'tester' WHERE 'the_key' IN (%s)"
+    assert cursor.query_after == \
+        "DELETE FROM 'tester' WHERE 'the_key' IN (5)"
+
+
+def test_delete_many_needs_model(cursor, run):
+    """verify that deleting by key requires a model"""
+
+    with pytest.raises(ValueError):
+        run(delete_many, cursor, [1])
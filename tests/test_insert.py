@@ -1,4 +1,8 @@
 """test model insert method"""
+# pylint: disable=protected-access
+import pytest
+
+from aiodb import get_updated, insert_many
 from tests.test_save import MockTable
 
 
@@ -11,3 +15,74 @@ def test_insert(cursor, run):
     assert test.the_key == primary_key
     assert cursor.query_after == \
         "INSERT INTO 'tester' ( 'the_key','name' ) VALUES ( 100,test )"
+
+
+def test_insert_many(cursor, run):
+    """verify multi-row insert grouped by inserted fields"""
+
+    tests = [
+        MockTable(name='a'),
+        MockTable(name='b', yeah='x'),
+        MockTable(name='c'),
+    ]
+    run(insert_many, cursor, tests)
+    assert cursor._execute.call_count == 2
+    assert cursor._execute.call_args_list[0].args[0] == (
+        "INSERT INTO 'tester' ( 'name' ) VALUES ( a ),( c )")
+    assert cursor.query_after == \
+        "INSERT INTO 'tester' ( 'name','yeah' ) VALUES ( b,x )"
+    assert get_updated(tests[1]) == {"name": (None, "b"), "yeah": (None, "x")}
+
+
+def test_insert_many_batch(cursor, run):
+    """verify that batches are limited by rows and bytes"""
+
+    run(insert_many, cursor,
+        [MockTable(name=str(n)) for n in range(5)], max_rows=2)
+    assert cursor._execute.call_count == 3
+
+    cursor._execute.reset_mock()
+    run(insert_many, cursor,
+        [MockTable(name='x' * 10) for n in range(5)], max_bytes=40)
+    assert cursor._execute.call_count == 3
+    first = cursor._execute.call_args_list[0].args[0]
+    assert first.count('x' * 10) == 2
+
+
+def test_insert_many_returned_keys(cursor, run):
+    """verify that keys returned by the database are assigned"""
+
+    cursor._execute.return_value = (('the_key',), ((7,), (8,)))
+    tests = [MockTable(name='a'), MockTable(name='b')]
+    run(insert_many, cursor, tests)
+    assert [test.the_key for test in tests] == [7, 8]
+
+
+def test_insert_many_consecutive_keys(cursor, run):
+    """verify that consecutive keys are assigned from last_id"""
+
+    tests = [MockTable(name='a'), MockTable(name='b')]
+    run(insert_many, cursor, tests, consecutive_keys=True)
+    assert [test.the_key for test in tests] == [100, 101]
+
+    tests = [MockTable(name='a'), MockTable(name='b')]
+    run(insert_many, cursor, tests)
+    assert [test.the_key for test in tests] == [None, None]
+
+
+def test_insert_many_single_row_key(cursor, run):
+    """verify that a one-row batch is assigned last_id"""
+
+    tests = [MockTable(name='a')]
+    run(insert_many, cursor, tests)
+    assert tests[0].the_key == 100
+
+
+def test_insert_many_key_without_force(cursor, run):
+    """verify that a primary key value requires force_insert"""
+
+    with pytest.raises(ValueError):
+        run(insert_many, cursor, [MockTable(name='a', the_key=1)])
+    with pytest.raises(ValueError):
+        run(insert_many, cursor, [MockTable(name='a')], force_insert=True)
+    cursor._execute.assert_not_called()
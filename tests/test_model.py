@@ -4,6 +4,8 @@ import pytest
 from aiodb import Model, Field
 from aiodb import ReservedAttributeError, RequiredAttributeError
 from aiodb import NoneValueError, MultiplePrimaryKeysError
+from aiodb import Integer, get_updated
+from aiodb.model import model as model_module
 
 
 def test_table_name():
@@ -106,6 +108,20 @@ def test_field():
     assert test._m.field('a').name == 'a'
 
 
+def test_field_lookup():
+    """verify field lookup by name"""
+
+    class Test(Model):
+        """model with a renamed column"""
+        a = Field(column='x')
+        b = Field(is_database=False)
+
+    assert Test._m.field('a').column == 'x'
+    assert Test._m.field('b').name == 'b'
+    with pytest.raises(AttributeError):
+        Test._m.field('x')
+
+
 def test_fields():
     """verify _fields"""
     test = FieldTest(a=0, b=0, c=0, d=0)
@@ -170,3 +186,74 @@ def test_join_lookup_dot():
     assert model.a == 'one'
     with pytest.raises(AttributeError):
         assert model.b == 'one'
+
+
+def test_descriptor():
+    """verify field descriptor access"""
+    test = FieldTest(a=0, b=1, c=0, d=0)
+    assert isinstance(FieldTest.b, Field)
+    assert test.b == '1'
+    test.b = 2
+    assert test.b == '2'
+    assert '__dict__' not in FieldTest.__dict__
+    with pytest.raises(AttributeError):
+        test.unknown = 1
+    with pytest.raises(AttributeError):
+        test.save = 1
+    test._private = 1  # pylint: disable=protected-access
+    assert test._private == 1  # pylint: disable=protected-access
+
+
+class Parent(Model):
+    """base model for inheritance tests"""
+    a = Field(is_primary=True)
+    b = Field()
+
+
+class Child(Parent):
+    """model with an inherited and an overridden field"""
+    c = Field()
+    b = Field(Integer)
+
+
+def test_state():
+    """verify compact instance state"""
+    test = Parent(a=1, b=2)
+    assert test._s.values == ['1', '2']
+    assert test._s.updated is None
+    assert test._s.tables is None
+    assert not hasattr(test._s, '__dict__')
+    assert get_updated(test) == {}
+    with pytest.raises(KeyError):
+        test['x']  # pylint: disable=pointless-statement
+
+
+def test_inherited_fields():
+    """verify that subclasses index their own copy of fields"""
+    assert [fld.name for fld in Child._m.fields] == ['a', 'c', 'b']
+    assert Child._m.field('a') is not Parent._m.field('a')
+    assert [fld.index for fld in Child._m.fields] == [0, 1, 2]
+    test = Child(a=1, b=2, c=3)
+    assert (test.a, test.b, test.c) == ('1', 2, '3')
+
+
+def test_none_value_error_path():
+    """verify that NoneValueError is still importable from model"""
+    assert model_module.NoneValueError is NoneValueError
+
+
+def test_shared_field():
+    """verify that a Field shared by classes is indexed per class"""
+    key = Field(Integer, is_primary=True)
+
+    class SharedA(Model):  # pylint: disable=missing-class-docstring
+        name = Field()
+        id = key
+
+    class SharedB(Model):  # pylint: disable=missing-class-docstring
+        id = key
+
+    assert SharedA._m.field('id') is not SharedB._m.field('id')
+    test = SharedA(name='x', id=5)
+    assert (test.name, test.id) == ('x', 5)
+    assert SharedB(id=7).id == 7
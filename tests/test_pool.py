@@ -2,7 +2,10 @@
 import asyncio
 from unittest import mock
 
-from aiodb.pool import Pool
+import pytest
+
+from aiodb.cursor import Cursor
+from aiodb.pool import Pool, PoolTimeoutError
 
 
 def test_empty():
@@ -41,6 +44,7 @@ def mock_connector(ping=True):
         con = mock.Mock()
         con.ping = mock.AsyncMock(return_value=ping)
         con.close = mock.AsyncMock()
+        con.rollback = mock.AsyncMock()
         return con
     return _connector
 
@@ -74,6 +78,21 @@ def test_failed_ping():
     asyncio.run(test())
 
 
+def test_ping_exception():
+    """test that a ping which raises is treated as a dead connection"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, max_overflow=0)
+        orig = pool.pool[0]
+        orig.ping.side_effect = ConnectionError()
+        con = await pool.cursor()
+        assert orig != con
+        assert con.pool_index == 1
+        assert pool.size == 1
+
+    asyncio.run(test())
+
+
 def test_close():
     """test that close connection returns to pool"""
 
@@ -86,3 +105,817 @@ def test_close():
         assert len(pool.pool) == size
 
     asyncio.run(test())
+
+
+def test_recycle():
+    """test that recycled connection is reset and returned to pool"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+        orig = pool.pool[0]
+        con = await pool.cursor()
+        con.query = "SELECT 1"
+        await con.close()
+        assert list(pool.pool) == [orig]
+        con.rollback.assert_called_once()
+        con.raw_close.assert_not_called()
+        assert con.query is None
+
+    asyncio.run(test())
+
+
+def test_recycle_replace():
+    """test that close(replace=True) replaces a recycled connection"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+        con = await pool.cursor()
+        await con.close(replace=True)
+        assert len(pool.pool) == 1
+        assert pool.pool[0] != con
+        con.raw_close.assert_called_once()
+
+    asyncio.run(test())
+
+
+def test_recycle_reset_failure():
+    """test that connection is replaced if reset fails"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+        con = await pool.cursor()
+        con.rollback.side_effect = Exception("broken")
+        await con.close()
+        assert pool.pool[0] != con
+        assert pool.pool[0].pool_index == 1
+
+    asyncio.run(test())
+
+
+def test_replace_failure():
+    """test that a connection which can't be replaced is dropped"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=mock_connector())
+        pool = await Pool.setup(connector, size=1, ping_after=30)
+        con = await pool.cursor()
+        connector.side_effect = Exception("no")
+        await con.close()
+        con.raw_close.assert_called_once()
+        assert not pool.pool
+        assert pool.size == 0
+        assert pool.stats.counts["replace_failure"] == 1
+
+        connector.side_effect = mock_connector()
+        new = await pool.cursor()
+        assert new is not con
+        assert new.pool_index == 1
+
+    asyncio.run(test())
+
+
+def test_replace_failure_waiter():
+    """test that a waiter gets a new connection if replace fails"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=mock_connector())
+        pool = await Pool.setup(
+            connector, size=1, max_overflow=0, ping_after=30)
+        con = await pool.cursor()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        connector.side_effect = [Exception("no"), await mock_connector()()]
+        await con.close()
+        new = await waiter
+        assert new is not con
+        assert new.pool_index == 1
+
+    asyncio.run(test())
+
+
+def test_recycle_max_uses():
+    """test that connection is replaced after max_uses checkouts"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, recycle=True, max_uses=2)
+        orig = pool.pool[0]
+        con = await pool.cursor()
+        await con.close()
+        assert pool.pool[0] == orig
+        con = await pool.cursor()
+        await con.close()
+        assert pool.pool[0] != orig
+        assert pool.pool[0].pool_uses == 0
+
+    asyncio.run(test())
+
+
+def test_recycle_max_age():
+    """test that connection is replaced after max_age seconds"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, recycle=True, max_age=60)
+        orig = pool.pool[0]
+        con = await pool.cursor()
+        con.pool_expires -= 61
+        await con.close()
+        assert pool.pool[0] != orig
+
+    asyncio.run(test())
+
+
+def test_overflow():
+    """test on-demand connections beyond the pool size"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, max_overflow=1)
+        con1 = await pool.cursor()
+        con2 = await pool.cursor()
+        assert con2.pool_index is None
+        assert pool.overflow == 1
+        await con2.close()
+        assert pool.overflow == 0
+        con2.raw_close.assert_called_once()
+        await con1.close()
+
+    asyncio.run(test())
+
+
+def test_wait_handoff():
+    """test that a released connection is handed to a waiting caller"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0, recycle=True)
+        con = await pool.cursor()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        assert pool.queue_depth == 1
+        await con.close()
+        assert await waiter is con
+        assert pool.queue_depth == 0
+        assert pool.stats.counts["wait"] == 1
+        assert len(pool.pool) == 0
+
+    asyncio.run(test())
+
+
+def test_wait_fifo():
+    """test that waiting callers are served in order"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0, recycle=True)
+        con = await pool.cursor()
+        first = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        await con.close()
+        assert await first is con
+        assert not second.done()
+        await con.close()
+        assert await second is con
+
+    asyncio.run(test())
+
+
+def test_wait_timeout():
+    """test acquire timeout"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0, timeout=0.01)
+        await pool.cursor()
+        with pytest.raises(PoolTimeoutError):
+            await pool.cursor()
+        assert pool.queue_depth == 0
+        assert pool.stats.counts["timeout"] == 1
+
+    asyncio.run(test())
+
+
+def test_overflow_handoff():
+    """test that an on-demand connection is handed to a waiting caller"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=0, max_overflow=1)
+        con = await pool.cursor()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        await con.close()
+        assert await waiter is con
+        assert pool.overflow == 1
+        con.raw_close.assert_not_called()
+
+    asyncio.run(test())
+
+
+def test_overflow_handoff_reset():
+    """test that an on-demand connection is reset before it is handed off"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=0, max_overflow=1, recycle=True)
+        con = await pool.cursor()
+        con.execute = mock.AsyncMock()
+        cursor = Cursor.bind(con)
+        await cursor.start_transaction()
+        con.rollback = cursor.rollback
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        await con.close()
+        assert await waiter is con
+        depth = cursor._transaction_depth  # pylint: disable=protected-access
+        assert depth == 0
+        assert con.execute.call_args_list == [
+            mock.call("BEGIN"), mock.call("ROLLBACK")]
+
+    asyncio.run(test())
+
+
+def test_overflow_handoff_reset_failure():
+    """test that an on-demand connection which can't be reset is closed"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=0, max_overflow=1)
+        con = await pool.cursor()
+        con.rollback.side_effect = Exception("broken")
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        await con.close()
+        new = await waiter
+        assert new is not con
+        con.raw_close.assert_called_once()
+        assert pool.overflow == 1
+
+    asyncio.run(test())
+
+
+def test_overflow_handoff_cancelled():
+    """test that an on-demand connection handed to a departed waiter closes"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=0, max_overflow=1)
+        con = await pool.cursor()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        await con.close()  # handed to the waiter ...
+        waiter.cancel()  # ... which gives up before it runs
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert pool.overflow == 0
+        assert len(pool.pool) == 0
+        con.raw_close.assert_called_once()
+
+    asyncio.run(test())
+
+
+def test_fifo():
+    """test that released connections go to the back of the pool"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=2, recycle=True)
+        con1 = await pool.cursor()
+        await con1.close()
+        con2 = await pool.cursor()
+        assert con1 != con2
+
+    asyncio.run(test())
+
+
+def test_lifo():
+    """test that released connections are used first in lifo mode"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=2, recycle=True, lifo=True)
+        con1 = await pool.cursor()
+        await con1.close()
+        con2 = await pool.cursor()
+        assert con1 == con2
+
+    asyncio.run(test())
+
+
+def test_lazy_growth():
+    """test that pool grows past min_size up to max_size"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=mock_connector())
+        pool = await Pool.setup(connector, min_size=1, max_size=2)
+        assert len(pool.pool) == 1
+        assert pool.size == 1
+        con1 = await pool.cursor()
+        con2 = await pool.cursor()
+        assert con2.pool_index == 2
+        assert pool.size == 2
+        con3 = await pool.cursor()
+        assert con3.pool_index is None
+        assert connector.call_count == 3
+        con1.ping.assert_called_once()
+        con2.ping.assert_not_called()
+
+    asyncio.run(test())
+
+
+def test_concurrent_setup():
+    """test that setup creates connections concurrently up to a limit"""
+
+    async def test():
+        active = []
+        peak = []
+
+        async def connector():
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+            return await mock_connector()()
+
+        pool = await Pool.setup(connector, size=6, concurrency=3)
+        assert len(pool.pool) == 6
+        assert max(peak) == 3
+        assert sorted(con.pool_index for con in pool.pool) == \
+            [1, 2, 3, 4, 5, 6]
+
+    asyncio.run(test())
+
+
+def test_setup_partial_failure():
+    """test that setup tolerates some failed connections"""
+
+    async def test():
+        good = mock_connector()
+        connector = mock.AsyncMock(
+            side_effect=[await good(), Exception("no"), await good()])
+        pool = await Pool.setup(connector, size=3)
+        assert len(pool.pool) == 2
+        assert pool.size == 2
+        assert pool.max_size == 3
+
+    asyncio.run(test())
+
+
+def test_setup_failure():
+    """test that setup fails if no connections can be created"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=Exception("no"))
+        with pytest.raises(Exception):
+            await Pool.setup(connector, size=2)
+
+    asyncio.run(test())
+
+
+def test_setup_sizes():
+    """test that min_size can't be more than max_size"""
+
+    async def test():
+        with pytest.raises(ValueError):
+            await Pool.setup(mock_connector(), min_size=20, max_size=10)
+
+    asyncio.run(test())
+
+
+def test_ping_after():
+    """test that recently used connections are not pinged at checkout"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, recycle=True, ping_after=60)
+        con = await pool.cursor()
+        con.ping.assert_not_called()
+        await con.close()
+        con.pool_idle_since -= 61
+        con = await pool.cursor()
+        con.ping.assert_called_once()
+
+    asyncio.run(test())
+
+
+def test_check():
+    """test that check replaces dead idle connections"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=2, ping_after=60)
+        alive, dead = pool.pool
+        dead.ping.return_value = False
+        await pool.check()
+        dead.ping.assert_not_called()  # not idle long enough
+        for con in (alive, dead):
+            con.pool_idle_since -= 61
+        await pool.check()
+        assert len(pool.pool) == 2
+        assert alive in pool.pool
+        assert dead not in pool.pool
+        dead.raw_close.assert_called_once()
+        assert sorted(con.pool_index for con in pool.pool) == [1, 2]
+
+    asyncio.run(test())
+
+
+def test_check_drop():
+    """test that check drops a dead connection that can't be replaced"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=mock_connector(False))
+        pool = await Pool.setup(connector, size=1, ping_after=0.001)
+        connector.side_effect = Exception("no")
+        await asyncio.sleep(0.002)
+        await pool.check()
+        assert len(pool.pool) == 0
+        assert pool.size == 0
+
+    asyncio.run(test())
+
+
+def test_check_refill():
+    """test that a caller waiting on a dropped connection is served"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=mock_connector())
+        pool = await Pool.setup(
+            connector, size=1, max_overflow=0, ping_after=0.001)
+        con = pool.pool[0]
+        pinged = asyncio.Event()
+
+        async def ping():
+            pinged.set()
+            await asyncio.sleep(0.01)
+            return False
+
+        con.ping = ping
+        await asyncio.sleep(0.002)
+        check = asyncio.create_task(pool.check())
+        await pinged.wait()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        assert pool.queue_depth == 1
+        connector.side_effect = [Exception("no"), await mock_connector()()]
+        await check
+        result = await waiter
+        assert result.pool_index == 1
+        assert pool.size == 1
+
+    asyncio.run(test())
+
+
+def test_check_ping_every_checkout():
+    """test that check does nothing when every checkout pings"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1)
+        con = pool.pool[0]
+        await pool.check()
+        con.ping.assert_not_called()
+        assert len(pool.pool) == 1
+
+    asyncio.run(test())
+
+
+def test_background_check():
+    """test that the maintenance task runs check"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, check_interval=0.01, ping_after=0.005)
+        con = pool.pool[0]
+        await asyncio.sleep(0.05)
+        assert con.ping.call_count > 1
+        await pool.close()
+        assert pool.maintenance is None
+        assert len(pool.pool) == 0
+        con.raw_close.assert_called_once()
+
+    asyncio.run(test())
+
+
+def test_max_age_jitter():
+    """test that max_age is shortened by a random amount"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=20, max_age=100, max_age_jitter=0.5)
+        lifetimes = [
+            con.pool_expires - con.pool_created for con in pool.pool]
+        assert all(50 <= lifetime <= 100 for lifetime in lifetimes)
+        assert len(set(lifetimes)) > 1
+
+    asyncio.run(test())
+
+
+def test_reap_idle():
+    """test that idle connections are closed down to min_size"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), min_size=1, max_size=3, idle_timeout=60)
+        cons = [await pool.cursor() for _ in range(3)]
+        for con in cons:
+            await con.close()
+        assert pool.size == 3
+        await pool.reap()
+        assert pool.size == 3  # not idle long enough
+        for con in pool.pool:
+            con.pool_idle_since -= 61
+        await pool.reap()
+        assert pool.size == 1
+        assert len(pool.pool) == 1
+
+    asyncio.run(test())
+
+
+def test_reap_expired():
+    """test that expired idle connections are replaced"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=2, max_age=60)
+        old, young = pool.pool
+        old.pool_expires -= 61
+        await pool.reap()
+        assert pool.size == 2
+        assert old not in pool.pool
+        assert young in pool.pool
+        old.raw_close.assert_called_once()
+
+    asyncio.run(test())
+
+
+def test_reap_refill():
+    """test that a caller waiting on a dropped expired connection is served"""
+
+    async def test():
+        connector = mock.AsyncMock(side_effect=mock_connector())
+        pool = await Pool.setup(
+            connector, size=1, max_overflow=0, max_age=60)
+        old = pool.pool[0]
+        old.pool_expires -= 61
+        closing = asyncio.Event()
+
+        async def raw_close():
+            closing.set()
+            await asyncio.sleep(0.01)
+
+        old.raw_close = raw_close
+        reap = asyncio.create_task(pool.reap())
+        await closing.wait()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        assert pool.queue_depth == 1
+        connector.side_effect = [Exception("no"), await mock_connector()()]
+        await reap
+        result = await waiter
+        assert result.pool_index == 1
+        assert pool.size == 1
+
+    asyncio.run(test())
+
+
+def test_snapshot():
+    """test pool gauges and counters"""
+
+    async def test():
+        events = []
+        pool = await Pool.setup(
+            mock_connector(), size=2, recycle=True, max_overflow=1)
+        pool.add_listener(lambda event, value: events.append((event, value)))
+        con1 = await pool.cursor()
+        con2 = await pool.cursor()
+        con3 = await pool.cursor()
+        snapshot = pool.snapshot()
+        assert snapshot["size"] == 2
+        assert snapshot["idle"] == 0
+        assert snapshot["in_use"] == 3
+        assert snapshot["pending"] == 0
+        assert snapshot["overflow"] == 1
+        assert snapshot["counts"] == {
+            "create": 2, "checkout": 3, "overflow": 1}
+        await con1.close()
+        await con2.close()
+        await con3.close()
+        con1 = await pool.cursor()
+        snapshot = pool.snapshot()
+        assert snapshot["idle"] == 1
+        assert snapshot["in_use"] == 1
+        assert snapshot["counts"]["checkin"] == 3
+        assert snapshot["uses"] == {1: 2, 2: 1}
+        assert events[0] == ("checkout", 1)
+        assert ("overflow", None) in events
+
+    asyncio.run(test())
+
+
+def test_wait_histogram():
+    """test wait time histogram"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0, timeout=0.02)
+        await pool.cursor()
+        with pytest.raises(PoolTimeoutError):
+            await pool.cursor()
+        histogram = pool.snapshot()["wait_histogram"]
+        assert sum(histogram.values()) == 1
+        assert histogram[.05] == 1
+        assert pool.stats.wait_time >= 0.02
+
+    asyncio.run(test())
+
+
+def test_acquire():
+    """test that acquire returns a bound cursor and releases it"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+        con = pool.pool[0]
+        con.execute = mock.AsyncMock()
+        async with pool.acquire() as cursor:
+            assert isinstance(cursor, Cursor)
+            assert len(pool.pool) == 0
+            await cursor.execute("SELECT 1")
+            con.execute.assert_called_once_with("SELECT 1")
+        assert list(pool.pool) == [con]
+        assert not pool.in_use
+
+    asyncio.run(test())
+
+
+def test_acquire_exception():
+    """test that acquire rolls back and releases on exception"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+        con = pool.pool[0]
+        con.execute = mock.AsyncMock()
+        with pytest.raises(ValueError):
+            async with pool.acquire() as cursor:
+                await cursor.start_transaction()
+                raise ValueError()
+        assert con.execute.call_args_list == [
+            mock.call("BEGIN"), mock.call("ROLLBACK")]
+        assert list(pool.pool) == [con]
+
+    asyncio.run(test())
+
+
+def test_acquire_cancel():
+    """test that acquire releases a cancelled task's connection"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+
+        async def hold():
+            async with pool.acquire():
+                await asyncio.sleep(10)
+
+        task = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert len(pool.pool) == 0
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert len(pool.pool) == 1
+
+    asyncio.run(test())
+
+
+def test_double_close():
+    """test that closing a connection twice only releases it once"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=1, recycle=True)
+        con = await pool.cursor()
+        await con.close()
+        await con.close()
+        assert len(pool.pool) == 1
+
+    asyncio.run(test())
+
+
+def test_leak():
+    """test leak detection"""
+
+    async def test():
+        with pytest.raises(ValueError):
+            await Pool.setup(mock_connector(), size=1, leak_timeout=60)
+        pool = await Pool.setup(
+            mock_connector(), size=1, leak_timeout=60, check_interval=60)
+        con = await pool.cursor()
+        assert con.pool_checkout_stack[-1].filename.endswith("test_pool.py")
+        await pool.check_leaks()
+        assert not con.pool_leaked
+        con.pool_checkout_time -= 61
+        with mock.patch("aiodb.pool.log") as log:
+            await pool.check_leaks()
+            await pool.check_leaks()
+            log.warning.assert_called_once()
+            assert "test_pool.py" in log.warning.call_args.args[-1]
+        assert pool.stats.counts["leak"] == 1
+        assert pool.in_use  # not reclaimed
+        await pool.close()
+
+    asyncio.run(test())
+
+
+def test_leak_reclaim():
+    """test that a leaked connection is reclaimed"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0,
+            leak_timeout=60, leak_reclaim=True, check_interval=60)
+        con = await pool.cursor()
+        waiter = asyncio.create_task(pool.cursor())
+        await asyncio.sleep(0)
+        con.pool_checkout_time -= 61
+        await pool.check_leaks()
+        con.raw_close.assert_called_once()
+        new = await waiter
+        assert new != con
+        assert new.pool_index == 1
+        await con.close()  # late close is ignored
+        assert len(pool.pool) == 0
+        await new.close()
+        assert len(pool.pool) == 1
+        await pool.close()
+
+    asyncio.run(test())
+
+
+def test_acquire_cancel_checkout():
+    """test that cancelling a checkout doesn't leak the connection slot"""
+
+    async def test():
+        blocked = asyncio.Event()
+
+        async def ping():
+            blocked.set()
+            await asyncio.sleep(10)
+
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0, timeout=0.1)
+        pool.pool[0].ping = ping
+
+        async def checkout():
+            async with pool.acquire():
+                pass
+
+        task = asyncio.create_task(checkout())
+        await blocked.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert len(pool.pool) == 1
+        assert pool.size == 1
+
+        pool.pool[0].ping = mock.AsyncMock(return_value=True)
+        con = await pool.cursor()
+        assert con.pool_index == 1
+
+    asyncio.run(test())
+
+
+def test_grow_cancel():
+    """test that cancelling a new connection releases its index"""
+
+    async def test():
+        pool = await Pool.setup(
+            mock_connector(), size=1, max_overflow=0, timeout=0.1)
+        await pool.cursor()
+        pool.max_size = 2
+        connector = pool.connector
+        pool.connector = mock.AsyncMock(side_effect=asyncio.CancelledError)
+        with pytest.raises(asyncio.CancelledError):
+            await pool.cursor()
+        assert pool.size == 1
+        pool.connector = connector
+        con = await pool.cursor()
+        assert con.pool_index == 2
+
+    asyncio.run(test())
+
+
+def test_snapshot_pending():
+    """test that connections being checked aren't counted as in use"""
+
+    async def test():
+        pool = await Pool.setup(mock_connector(), size=2, ping_after=5)
+        snapshots = []
+
+        async def ping():
+            snapshots.append(pool.snapshot())
+            return True
+
+        for con in pool.pool:
+            con.pool_idle_since -= 10
+            con.ping = ping
+        await pool.check()
+        assert snapshots[0]["in_use"] == 0
+        assert snapshots[0]["idle"] == 0
+        assert snapshots[0]["pending"] == 2
+        assert pool.snapshot()["pending"] == 0
+
+    asyncio.run(test())
@@ -1,10 +1,14 @@
 """test query operations"""
+from unittest import mock
+
 import pytest
 from aiodb import Model, Field
-from aiodb.model.query import QueryTable
+from aiodb.model.types import Boolean, Integer
+from aiodb.model.query import Query, QueryTable, STATEMENTS, LAYOUTS
 from aiodb.model.query import _find_foreign_key_reference
 from aiodb.model.query import _find_primary_key_reference
 from aiodb.model.query import _pair
+from aiodb.model import query as query_module
 
 
 class A(Model):  # pylint: disable=invalid-name
@@ -104,6 +108,15 @@ def test_find_foreign_multiple():
     assert ex.value.args[0] == "'B' has multiple foreign keys that match"
 
 
+def test_references():
+    """verify foreign key target index"""
+    # pylint: disable=protected-access
+    assert B._m.references(A) == [B._m.field('a_id')]
+    assert B._m.references(C) == [B._m.field('c_id')]
+    assert not B._m.references(B)
+    assert not A._m.references(B)
+
+
 def test_find_primary():
     """test primary key match"""
     table, field = _find_primary_key_reference(A, (B,))
@@ -137,3 +150,211 @@ def test_pair(tab1, tab2, limit, match_col1, match_tab, match_col2):
     assert column1 == match_col1
     assert table2 == match_tab
     assert column2 == match_col2
+
+
+def test_statement_cache():
+    """verify that statements are built once per query shape"""
+    STATEMENTS.clear()
+    query = A.query.join(B).where('{TABLE.A}.id=%s')
+    stmt = query._prepare(  # pylint: disable=protected-access
+        False, None, None, None, "'")
+    assert len(STATEMENTS) == 1
+
+    with mock.patch.object(Query, '_build') as build:
+        query = A.query.join(B).where('{TABLE.A}.id=%s')
+        assert query._prepare(  # pylint: disable=protected-access
+            False, None, None, None, "'") == stmt
+        build.assert_not_called()
+
+    for quote, where, limit, alias in (
+            ('`', '{TABLE.A}.id=%s', None, None),
+            ("'", '{TABLE.A}.id=1', None, None),
+            ("'", '{TABLE.A}.id=%s', 10, None),
+            ("'", '{TABLE.A}.id=%s', None, 'BB')):
+        query = A.query.join(B, alias=alias).where(where)
+        assert query._prepare(  # pylint: disable=protected-access
+            False, limit, None, None, quote) != stmt
+    assert len(STATEMENTS) == 5
+
+
+def test_stream(cursor, run):
+    """verify that stream yields models batch by batch"""
+
+    async def stream(query, batch_size):
+        assert batch_size == 2
+        for rows in ([(1,), (2,)], [(3,)]):
+            yield ('0_id',), rows
+
+    cursor._stream = stream  # pylint: disable=protected-access
+
+    async def test():
+        return [model async for model in A.query.stream(cursor, batch_size=2)]
+
+    result = run(test)
+    assert [model.id for model in result] == ['1', '2', '3']
+    assert all(isinstance(model, A) for model in result)
+
+
+def test_seek():
+    """verify keyset predicate and order"""
+    query = B.query.seek(('a_id', 'id'))
+    stmt = query._prepare(  # pylint: disable=protected-access
+        False, 10, None, None, "'")
+    assert stmt.endswith(" ORDER BY 'b'.'a_id', 'b'.'id' LIMIT 10")
+
+    query = B.query.where("'b'.'c_id'=%s").seek(('a_id', 'id'), (1, 2))
+    stmt = query._prepare(  # pylint: disable=protected-access
+        False, 10, None, None, "'")
+    assert stmt.endswith(
+        " WHERE ('b'.'c_id'=%s) AND ('b'.'a_id', 'b'.'id') > (%s, %s)"
+        " ORDER BY 'b'.'a_id', 'b'.'id' LIMIT 10")
+    assert query._args(5) == (5, 1, 2)  # pylint: disable=protected-access
+
+    query = A.query.join(B).seek('b.id', 3, descending=True)
+    stmt = query._prepare(  # pylint: disable=protected-access
+        False, None, None, None, "'")
+    assert stmt.endswith(" WHERE 'b'.'id' < %s ORDER BY 'b'.'id' DESC")
+
+
+def test_pages(cursor, run):
+    """verify that pages walks the table with keyset predicates"""
+
+    pages = [[('1',), ('2',)], [('3',), ('4',)], [('5',)]]
+    cursor._execute.side_effect = [  # pylint: disable=protected-access
+        (('0_id',), page) for page in pages]
+
+    query = A.query
+
+    async def test():
+        return [page async for page in query.pages(cursor, 'id', size=2)]
+
+    result = run(test)
+    assert [[model.id for model in page] for page in result] == \
+        [['1', '2'], ['3', '4'], ['5']]
+    assert cursor.query_after == (
+        "SELECT 'a'.'id' AS 0_id FROM 'yikes' AS 'a'"
+        " WHERE 'a'.'id' > 4 ORDER BY 'a'.'id' LIMIT 2")
+
+    # the query itself is not left with the last page's seek state
+    cursor._execute.side_effect = None  # pylint: disable=protected-access
+    run(query.execute, cursor)
+    assert cursor.query_after == "SELECT 'a'.'id' AS 0_id FROM 'yikes' AS 'a'"
+
+
+@pytest.mark.parametrize('as_,expect', (
+    ('tuples', [('1',), ('2',)]),
+    ('dicts', [{'id': '1'}, {'id': '2'}]),
+    ('namedtuples', [('1',), ('2',)]),
+))
+def test_as(cursor, run, as_, expect):
+    """verify light-weight row types"""
+    cursor._execute.return_value = (  # pylint: disable=protected-access
+        ('0_id',), [('1',), ('2',)])
+    result = run(A.query.execute, cursor, as_=as_)
+    assert result == expect
+    if as_ == 'namedtuples':
+        assert result[0].id == '1'
+        assert type(result[0]).__name__ == 'A'
+
+
+def test_as_join(cursor, run):
+    """verify light-weight row types with joins"""
+    rows = [('1', '10', '1', None), ('2', None, None, None)]
+    cursor._execute.return_value = (  # pylint: disable=protected-access
+        ('0_id', '1_id', '1_a_id', '1_c_id'), rows)
+    query = A.query.join(B, outer='left')
+
+    result = run(query.execute, cursor, as_='tuples')
+    assert result == [(('1',), ('10', '1', None)), (('2',), None)]
+
+    result = run(query.execute, cursor, as_='dicts')
+    assert result == [
+        {'id': '1', 'b': {'id': '10', 'a_id': '1', 'c_id': None}},
+        {'id': '2', 'b': None}]
+
+    result = run(query.execute, cursor, as_='namedtuples')
+    assert result[0].a.id == '1'
+    assert result[0].b.a_id == '1'
+    assert result[1].b is None
+
+
+def test_as_invalid(cursor, run):
+    """verify as_ validation"""
+    with pytest.raises(ValueError):
+        run(A.query.execute, cursor, as_='lists')
+
+
+class E(Model):  # pylint: disable=invalid-name
+    """test model with a non-database field"""
+    id = Field(is_primary=True)
+    a_id = Field(foreign='tests.test_query.A')
+    note = Field(is_database=False, is_nullable=True)
+    name = Field()
+
+
+def test_execute_join(cursor, run):
+    """verify that result rows are split into joined models"""
+    rows = [('1', '10', '1', 'x'), ('2', None, None, None)]
+    cursor._execute.return_value = (  # pylint: disable=protected-access
+        ('0_id', '1_id', '1_a_id', '1_name'), rows)
+    LAYOUTS.clear()
+    query = A.query.join(E, outer='left')
+    result = run(query.execute, cursor)
+    assert [model.id for model in result] == ['1', '2']
+    assert result[0].e.name == 'x'
+    assert result[0].e.note is None
+    assert result[1]['e'] is None
+    assert len(LAYOUTS) == 1
+    run(A.query.join(E, outer='left').execute, cursor)
+    assert len(LAYOUTS) == 1
+
+
+class F(Model):  # pylint: disable=invalid-name
+    """test model with typed fields"""
+    id = Field(Integer, is_primary=True)
+    name = Field()
+    flag = Field(Boolean)
+
+
+class G(Model):  # pylint: disable=invalid-name
+    """test model with a custom constructor"""
+    id = Field(is_primary=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._extra = True
+
+
+def test_hydrate(cursor, run):
+    """verify that only non-native values are parsed"""
+    cursor._execute.return_value = (  # pylint: disable=protected-access
+        ('0_id', '0_name', '0_flag'), [(1, 'a', 'false'), ('2', 3, 1)])
+    field = F._m.field('id')  # pylint: disable=protected-access
+    with mock.patch.object(field, 'parse', wraps=field.parse) as parse:
+        result = run(F.query.execute, cursor)
+    assert parse.call_count == 1
+    assert [(m.id, m.name, m.flag) for m in result] == [
+        (1, 'a', 0), (2, '3', 1)]
+    assert not result[0]._s.tables  # pylint: disable=protected-access
+    result[0].name = 'b'
+    assert run(result[0].save, cursor) is not None
+    assert cursor.query_after == "UPDATE  'f' SET 'name'=b WHERE  'id'=1"
+
+
+def test_hydrate_init(cursor, run):
+    """verify that a custom constructor is called"""
+    cursor._execute.return_value = (  # pylint: disable=protected-access
+        ('0_id',), [('1',)])
+    result = run(G.query.execute, cursor)
+    assert result[0]._extra is True  # pylint: disable=protected-access
+
+
+def test_namedtuple_lookup(cursor, run):
+    """verify that the namedtuple class is looked up once per table"""
+    cursor._execute.return_value = (  # pylint: disable=protected-access
+        ('0_id',), [('1',), ('2',), ('3',)])
+    with mock.patch('aiodb.model.query._namedtuple',
+                    wraps=query_module._namedtuple) as lookup:
+        result = run(A.query.execute, cursor, as_='namedtuples')
+    assert [row.id for row in result] == ['1', '2', '3']
+    assert lookup.call_count == 1
@@ -0,0 +1,184 @@
+"""test read/write router"""
+import asyncio
+from unittest import mock
+
+import pytest
+
+from aiodb import Model, Field
+from aiodb.pool import Pool, PoolTimeoutError
+from aiodb.router import Router, is_read
+
+
+class Item(Model):
+    """test model"""
+    id = Field(is_primary=True)
+    name = Field()
+
+
+def connector(name):
+    """fake database connection factory"""
+    async def _connector():
+        con = mock.Mock()
+        con.name = name
+        con.ping = mock.AsyncMock(return_value=True)
+        con.close = mock.AsyncMock()
+        con.rollback = mock.AsyncMock()
+        con.execute = mock.AsyncMock(return_value=((), ()))
+        con.serialize = str
+        con.last_id = mock.Mock(return_value=100)
+        con.quote = "'"
+        return con
+    return _connector
+
+
+async def router(replicas=2):
+    """return a router with a primary and some replicas"""
+    primary = await Pool.setup(connector("primary"), size=1, recycle=True)
+    pools = [
+        await Pool.setup(connector(f"replica{index}"), size=2, recycle=True)
+        for index in range(replicas)]
+    return Router(primary, pools, quote="'")
+
+
+def executed(pool):
+    """return number of statements executed on pool's connections"""
+    return sum(
+        con.execute.call_count
+        for con in list(pool.pool) + list(pool.in_use.values()))
+
+
+@pytest.mark.parametrize("query,expect", (
+    ("SELECT 1", True),
+    ("  select * from a", True),
+    ("SELECT * FROM a FOR UPDATE", False),
+    ("SELECT * FROM a for share", False),
+    ("SELECT * FROM a LOCK IN SHARE MODE", False),
+    ("SELECT * FROM a FOR NO KEY UPDATE", False),
+    ("SELECT * FROM a FOR KEY SHARE", False),
+    ("INSERT INTO a VALUES (1)", False),
+    ("BEGIN", False),
+))
+def test_is_read(query, expect):
+    """verify read detection"""
+    assert is_read(query) == expect
+
+
+def test_read(run):
+    """reads go to replicas"""
+
+    async def test():
+        rtr = await router()
+        async with rtr.acquire() as cursor:
+            await cursor.select("SELECT %s", 1)
+            assert cursor.query_after == "SELECT 1"
+            await Item.query.execute(cursor)
+        assert executed(rtr.primary) == 0
+        assert executed(rtr.replicas[0].pool) == 1
+        assert executed(rtr.replicas[1].pool) == 1
+
+    run(test)
+
+
+def test_write(run):
+    """writes, locking reads and transactions go to the primary"""
+
+    async def test():
+        rtr = await router()
+        async with rtr.acquire() as cursor:
+            item = await Item(name="a").save(cursor)
+            assert item.id == "100"
+            await Item.query.execute(cursor, for_update=True)
+            await cursor.start_transaction()
+            await cursor.select("SELECT 1")
+            await cursor.commit()
+            assert cursor.query_after == "COMMIT"
+        assert executed(rtr.primary) == 5
+        assert executed(rtr.replicas[0].pool) == 0
+        assert executed(rtr.replicas[1].pool) == 0
+        assert len(rtr.primary.pool) == 1
+
+    run(test)
+
+
+def test_least_outstanding():
+    """reads go to the replica with the fewest outstanding statements"""
+
+    async def test():
+        rtr = await router()
+        rtr.replicas[0].outstanding = 1
+        assert rtr.choose() is rtr.replicas[1]
+        assert rtr.choose() is rtr.replicas[1]
+        rtr.replicas[0].outstanding = 0
+        assert rtr.choose() is rtr.replicas[0]
+        assert rtr.choose() is rtr.replicas[1]
+
+    asyncio.run(test())
+
+
+def test_eject(run):
+    """a replica that can't be reached is ejected"""
+
+    async def test():
+        rtr = await router(replicas=1)
+        replica = rtr.replicas[0]
+        replica.pool.cursor = mock.AsyncMock(side_effect=Exception("down"))
+        async with rtr.acquire() as cursor:
+            await cursor.select("SELECT 1")
+            assert not replica.is_healthy
+            assert rtr.choose() is None
+            await cursor.select("SELECT 1")
+        replica.pool.cursor.assert_called_once()
+        assert executed(rtr.primary) == 2
+
+    run(test)
+
+
+def test_busy_replica(run):
+    """a replica that times out at checkout is not ejected"""
+
+    async def test():
+        rtr = await router(replicas=1)
+        replica = rtr.replicas[0]
+        replica.pool.cursor = mock.AsyncMock(side_effect=PoolTimeoutError())
+        async with rtr.acquire() as cursor:
+            await cursor.select("SELECT 1")
+        assert replica.is_healthy
+        assert executed(rtr.primary) == 1
+
+    run(test)
+
+
+def test_rollback(run):
+    """an exception rolls back the primary transaction"""
+
+    async def test():
+        rtr = await router()
+        con = rtr.primary.pool[0]
+        with pytest.raises(ValueError):
+            async with rtr.acquire() as cursor:
+                await cursor.start_transaction()
+                raise ValueError()
+        assert con.execute.call_args_list == [
+            mock.call("BEGIN"), mock.call("ROLLBACK")]
+
+    run(test)
+
+
+def test_close_rollback(run):
+    """closing with an open transaction rolls it back"""
+
+    async def test():
+        rtr = await router()
+        con = rtr.primary.pool[0]
+        cursor = rtr.cursor()
+        await cursor.start_transaction()
+        await cursor.start_transaction()
+        await cursor.execute("UPDATE a SET b=1")
+        await cursor.commit()  # nested; nothing committed
+        await cursor.close()
+        assert con.execute.call_args_list == [
+            mock.call("BEGIN"), mock.call("UPDATE a SET b=1"),
+            mock.call("ROLLBACK")]
+        assert len(rtr.primary.pool) == 1
+
+    run(test)
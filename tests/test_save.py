@@ -2,7 +2,9 @@
 # pylint: disable=protected-access
 from unittest import mock
 
-from aiodb import Model, Field, Integer, get_updated
+import pytest
+
+from aiodb import Model, Field, Integer, get_updated, update_many
 
 from tests.conftest import run_async
 
@@ -119,3 +121,77 @@ def test_update_updated(cursor):
 
     run_async(test.save, cursor)  # nothing changed
     assert get_updated(test) == {}
+
+
+def test_dirty(cursor):
+    """verify that only fields set since init or save are tracked"""
+
+    test = MockTable(the_key=10, name='a', yeah='a')
+    assert test._s.original is None
+
+    test.yeah = 'b'
+    test.yeah = 'c'
+    test.name = 'a'  # set to the same value
+    assert test._s.original == {1: 'a', 2: 'a'}
+    run_async(test.save, cursor)
+    assert get_updated(test) == {'yeah': ('a', 'c')}
+    assert test._s.original is None
+
+    test.yeah = 'd'
+    test.yeah = 'c'  # back to the original value
+    cursor._execute.reset_mock()
+    run_async(test.save, cursor)
+    cursor._execute.assert_not_called()
+
+
+def test_statement_cache(cursor):
+    """verify that statements are compiled once per field set and quote"""
+
+    MockTable._m.statements.clear()
+    run_async(MockTable(name='a').save, cursor)
+    run_async(MockTable(name='b').save, cursor)
+    assert len(MockTable._m.statements) == 1
+    run_async(MockTable(name='c', yeah='d').save, cursor)
+    assert len(MockTable._m.statements) == 2
+    cursor.quote = '!'
+    run_async(MockTable(name='a').save, cursor)
+    assert len(MockTable._m.statements) == 3
+    assert cursor.query == "INSERT INTO !tester! ( !name! ) VALUES ( %s )"
+
+
+def test_update_many(cursor):
+    """verify batched update grouped by changed fields"""
+
+    tests = [
+        MockTable(the_key=1, name='a', yeah='a'),
+        MockTable(the_key=2, name='b', yeah='b'),
+        MockTable(the_key=3, name='c', yeah='c'),
+        MockTable(the_key=4, name='d', yeah='d'),
+    ]
+    tests[0].name = 'aa'
+    tests[1].name = 'bb'
+    tests[2].name = 'cc'
+    tests[2].yeah = 'cc'
+    run_async(update_many, cursor, tests)
+    assert cursor._execute.call_count == 2
+    assert cursor._execute.call_args_list[0].args[0] == (
+        "UPDATE  'tester' SET 'name'=CASE 'the_key'"
+        " WHEN 1 THEN aa WHEN 2 THEN bb END"
+        " WHERE  'the_key' IN (1,2)")
+    assert cursor.query_after == (
+        "UPDATE  'tester' SET 'name'=CASE 'the_key' WHEN 3 THEN cc END,"
+        "'yeah'=CASE 'the_key' WHEN 3 THEN cc END"
+        " WHERE  'the_key' IN (3)")
+    assert get_updated(tests[0]) == {'name': ('a', 'aa')}
+    assert get_updated(tests[3]) == {}
+
+    cursor._execute.reset_mock()
+    run_async(update_many, cursor, tests)  # nothing changed
+    cursor._execute.assert_not_called()
+
+
+def test_update_many_no_key(cursor):
+    """verify that update_many requires primary key values"""
+    with pytest.raises(ValueError):
+        run_async(update_many, cursor, [MockTable(name='a')])
+    cursor._execute.assert_not_called()
@@ -0,0 +1,202 @@
+"""verify session operation"""
+# pylint: disable=protected-access
+import pytest
+
+from aiodb import Model, Field, Integer, Session
+from aiodb.model.session import _dependency_order
+
+
+class Parent(Model):
+    """test model"""
+    id = Field(Integer, is_primary=True)
+    name = Field()
+
+
+class Child(Model):
+    """test model"""
+    id = Field(Integer, is_primary=True)
+    parent_id = Field(Integer, foreign='tests.test_session.Parent')
+
+
+class GrandChild(Model):
+    """test model"""
+    id = Field(Integer, is_primary=True)
+    child_id = Field(Integer, foreign='tests.test_session.Child')
+
+
+def test_dependency_order():
+    """verify that referenced classes are first"""
+    assert _dependency_order({GrandChild, Parent, Child}) == \
+        [Parent, Child, GrandChild]
+    assert _dependency_order({GrandChild, Parent}) == [GrandChild, Parent]
+
+
+def test_load(cursor, run):
+    """verify that repeated loads are served from the identity map"""
+    cursor._execute.return_value = (('0_id', '0_name'), [(1, 'a')])
+    session = Session(cursor)
+    model = run(session.load, Parent, 1)
+    assert model.name == 'a'
+    assert run(session.load, Parent, '1') is model
+    assert cursor._execute.call_count == 1
+    assert session.get(Parent, 1) is model
+    assert session.get(Parent, 2) is None
+
+
+def test_query(cursor, run):
+    """verify that query results are merged into the identity map"""
+    cursor._execute.return_value = (('0_id', '0_name'), [(1, 'a')])
+    session = Session(cursor)
+    model = run(session.load, Parent, 1)
+    model.name = 'b'
+
+    result = run(session.query, Parent.query)
+    assert result == [model]
+    assert result[0].name == 'b'  # pending change is kept
+    assert run(session.query, Parent.query, one=True) is model
+    assert run(session.query, Parent.query, as_='tuples') == [(1, 'a')]
+
+
+def test_query_join(cursor, run):
+    """verify that joined models are merged"""
+    cursor._execute.return_value = (
+        ('0_id', '0_parent_id', '1_id', '1_name'), [(10, 1, 1, 'a')])
+    session = Session(cursor)
+    result = run(session.query, Child.query.join(Parent))
+    assert result[0].parent is session.get(Parent, 1)
+    assert len(session.identity) == 2
+
+
+def test_query_join_one_to_many(cursor, run):
+    """verify that each row keeps its own joined models"""
+    cursor._execute.return_value = (
+        ('0_id', '0_name', '1_id', '1_parent_id'),
+        [(1, 'a', 10, 1), (1, 'a', 11, 1)])
+    session = Session(cursor)
+    result = run(session.query, Parent.query.join(Child))
+    parent = session.get(Parent, 1)
+    assert [row.model for row in result] == [parent, parent]
+    assert [row.child.id for row in result] == [10, 11]
+    assert result[1]['child'] is session.get(Child, 11)
+    assert result[0].name == 'a'
+    result[0].name = 'b'
+    assert session.dirty() == [parent]
+    assert parent._s.tables is None
+
+    cursor._execute.return_value = (
+        ('0_id', '0_name', '1_id', '1_parent_id'), [(1, 'a', 12, 1)])
+    again = run(session.query, Parent.query.join(Child))
+    assert again[0].child.id == 12
+    assert result[0].child.id == 10  # earlier results are unchanged
+
+
+def test_add(cursor):
+    """verify pending models"""
+    session = Session(cursor)
+    models = [session.add(Parent(name=str(n))) for n in range(3)]
+    assert session.add(models[1]) is models[1]
+    assert session.new == models
+    assert models[2] in session
+    session.delete(models[1])
+    assert session.new == [models[0], models[2]]
+    assert models[1] not in session
+
+
+def test_flush(cursor, run):
+    """verify flush order and batching"""
+    cursor._execute.return_value = (('0_id', '0_name'), [(1, 'a')])
+    session = Session(cursor)
+    loaded = run(session.load, Parent, 1)
+    loaded.name = 'b'
+    cursor._execute.reset_mock()
+
+    session.add(Child(id=10, parent_id=2))
+    session.add(Child(id=11, parent_id=2))
+    session.add(Parent(id=2, name='c'))
+    removed = session.add(Parent(id=3, name='d'))
+    session.delete(removed)  # never inserted
+    session.delete(Child(id=12, parent_id=1))
+    run(session.commit)
+
+    statements = [call.args[0] for call in cursor._execute.call_args_list]
+    assert statements == [
+        "INSERT INTO 'parent' ( 'id','name' ) VALUES ( 2,c )",
+        "INSERT INTO 'child' ( 'id','parent_id' ) VALUES ( 10,2 ),( 11,2 )",
+        "UPDATE  'parent' SET 'name'=CASE 'id' WHEN 1 THEN b END"
+        " WHERE  'id' IN (1)",
+        "DELETE FROM 'child' WHERE 'id' IN (12)",
+    ]
+    assert session.get(Child, 11).parent_id == 2
+    assert not session.new
+    assert not session.deleted
+    assert not session.dirty()
+
+    cursor._execute.reset_mock()
+    run(session.flush)
+    cursor._execute.assert_not_called()
+
+
+def test_generated_keys(cursor, run):
+    """verify that database-assigned keys are picked up"""
+    session = Session(cursor)
+    first = session.add(Parent(name='a'))
+    second = session.add(Parent(name='b'))
+    run(session.commit)
+    assert cursor._execute.call_count == 2  # one row at a time
+    assert first.id == 100
+    assert session.get(Parent, 100) in (first, second)
+
+    cursor._execute.reset_mock()
+    session = Session(cursor, consecutive_keys=True)
+    first = session.add(Parent(name='a'))
+    second = session.add(Parent(name='b'))
+    run(session.commit)
+    assert cursor._execute.call_count == 1
+    assert (first.id, second.id) == (100, 101)
+    assert session.get(Parent, 101) is second
+
+
+def test_generated_keys_returned(cursor, run):
+    """verify that new models are batched if the keys are returned"""
+    cursor._execute.side_effect = [
+        (('id',), [(100,)]), (('id',), [(101,), (102,)])]
+    session = Session(cursor)
+    models = [session.add(Parent(name=str(n))) for n in range(3)]
+    run(session.commit)
+    statements = [call.args[0] for call in cursor._execute.call_args_list]
+    assert statements == [
+        "INSERT INTO 'parent' ( 'name' ) VALUES ( 0 )",
+        "INSERT INTO 'parent' ( 'name' ) VALUES ( 1 ),( 2 )",
+    ]
+    assert [model.id for model in models] == [100, 101, 102]
+    assert session.get(Parent, 102) is models[2]
+
+
+def test_commit_failure(cursor, run):
+    """verify that a failed commit keeps the unit of work"""
+    cursor._execute.return_value = (('0_id', '0_name'), [(1, 'a')])
+    session = Session(cursor)
+    loaded = run(session.load, Parent, 1)
+    loaded.name = 'b'
+    parent = session.add(Parent(name='c'))
+    child = session.add(Child(id=10, parent_id=2))
+    removed = Child(id=11, parent_id=1)
+    session.delete(removed)
+
+    cursor._execute.side_effect = [((), ()), Exception('no')]
+    with pytest.raises(Exception):
+        run(session.commit)
+
+    assert session.new == [parent, child]
+    assert session.deleted == [removed]
+    assert parent.id is None
+    assert session.dirty() == [loaded]
+    assert list(session.identity) == [(Parent, 1)]
+
+    cursor._execute.side_effect = None
+    cursor._execute.return_value = ((), ())
+    cursor._execute.reset_mock()
+    run(session.commit)
+    assert cursor._execute.call_count == 4
+    assert not session.new
+    assert not session.deleted